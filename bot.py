@@ -34,6 +34,7 @@ import traceback
 
 from client import Client
 from pgoapi.exceptions import NotLoggedInException
+from pgoapi.world_store import WorldStore
 
 from geopy.geocoders import GoogleV3
 from ortools.constraint_solver import pywrapcp
@@ -66,15 +67,14 @@ logging.getLogger('client').addHandler(consoleHandler)
 
 class Cluster():
 
-    def __init__(self, lst):
-        self.lst = lst
+    def __init__(self, index):
+        # index: pgoapi.spatial_index.SpatialIndex of the pokestops
+        keys, self.X = index.to_numpy()
+        self.lst = [index.get(key) for key in keys]
         print 'Pokestop = ', len(self.lst)
 
     def solve(self):
-        X = []
-        for p in self.lst:
-            X.append([p['latitude'], p['longitude']])
-        X = np.array(X)
+        X = self.X
 
         db = DBSCAN(eps=0.001, min_samples=2).fit(X)
         core_samples_mask = np.zeros_like(db.labels_, dtype=bool)
@@ -260,13 +260,7 @@ def main():
 
     ################################################ Actual
 
-    auth_token = None
-    try:
-        with open("token.txt", "r") as f:
-            auth_token = f.read().strip()
-    except:
-        pass
-
+    # tokens are cached in tokens.json by pgoapi, logins within their lifetime skip the auth server
     #######################################################
     start_time = time.time()
     start_exp = 0
@@ -277,11 +271,13 @@ def main():
     evolve_list = [ ]
 
     map_showed = False
+    # the map learned so far survives restarts of the client and of the bot
+    world_store = WorldStore('world.db')
     while True:
-        client = Client()
+        client = Client(world_store=world_store)
         client.jump_to(*position)
         try:
-            if not client.login(str(config.auth_service), str(config.username), str(config.password), auth_token=auth_token):
+            if not client.login(str(config.auth_service), str(config.username), str(config.password)):
                 print 'Login failed, retry after 30s'
                 time.sleep(30)
                 continue
@@ -301,7 +297,7 @@ def main():
             #     client.bulk_evolve_pokemon(dry=False)
             #     for pokemon_id in evolve_list:
             #         client.manual_evolve_pokemon(pokemon_id, dry=False)
-            clustered_pokestops = Cluster(client.get_pokestop()).solve()
+            clustered_pokestops = Cluster(client.pokestop_index).solve()
             sorted_pokestops = TSP(clustered_pokestops).solve()
 
             if not map_showed:
@@ -318,9 +314,6 @@ def main():
                     client.profile['poke_stop_visits'] - start_pokestop,
                     float(exp_delta) / time_delta * 3600)
         except NotLoggedInException:
-            if auth_token is not None:
-                print 'Token login failed, use password'
-                auth_token = None
             print 'NotLoggedInException, continue'
             continue
         except KeyboardInterrupt:
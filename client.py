@@ -33,6 +33,13 @@ import os
 from collections import defaultdict
 
 from pgoapi import PGoApi
+from pgoapi.rate_limit import RateLimiter
+from pgoapi.throttle import ThrottleController
+from pgoapi.inventory import InventoryState
+from pgoapi.map_cache import MapCellCache
+from pgoapi.cell_cover import get_cell_ids
+from pgoapi.spatial_index import SpatialIndex
+from pgoapi.utilities import get_time_ms
 
 from pgoapi.protos.POGOProtos.Inventory_pb2 import ItemId
 from pgoapi.protos.POGOProtos.Enums_pb2 import PokemonId
@@ -43,7 +50,6 @@ from pgoapi.protos.POGOProtos.Networking.Responses_pb2 import (
 
 from google.protobuf.internal import encoder
 from geopy.distance import great_circle
-from s2sphere import CellId, LatLng
 
 log = logging.getLogger(__name__)
 
@@ -102,6 +108,24 @@ class MyDict(dict):
             val = MyDict(val)
         return val
 
+
+class MyResponses(object):
+
+    # Sub-responses are decoded lazily by pgoapi, so only touch the ones asked for
+    def __init__(self, responses):
+        self._responses = responses
+
+    def __contains__(self, key):
+        return key in self._responses
+
+    def __getitem__(self, key):
+        if key not in self._responses:
+            return MyDict({})
+        val = self._responses[key]
+        if isinstance(val, dict) and not isinstance(val, MyDict):
+            val = MyDict(val)
+        return val
+
 with open('data/GAME_MASTER_POKEMON.tsv') as tsv:
     lines = [line for line in csv.reader(tsv, delimiter="\t")]
     POKEDEX = {}
@@ -158,8 +182,11 @@ def timing(func):
 
 class Client:
 
-    def __init__(self):
-        self._api = PGoApi()
+    def __init__(self, api=None, world_store=None, wild_pokemon_range=None):
+        # api: a preconfigured PGoApi, e.g. one talking to pgoapi.standin for offline runs
+        # world_store: a pgoapi.world_store.WorldStore to save the map to and warm start from
+        # wild_pokemon_range: metres around the player wild_pokemon is limited to (None = all visible ones)
+        self._api = api or PGoApi(rate_limiter=RateLimiter(rate=3, burst=3), throttle=ThrottleController())
         self._req = self._api.create_request()
 
         self._lat = 0
@@ -172,14 +199,33 @@ class Client:
         self.profile['cnt_pokemon'] = 0
         self.profile['cnt_item'] = 0
 
+        # derived from the inventory snapshot, only changed entries are recomputed per scan
+        self.inventory = InventoryState()
         self.incubator = {}
         self.item = defaultdict(int)
         self.family = defaultdict(list)
         self.candy = defaultdict(int)
         self.egg = []
 
+        # forts and pokemon per S2 cell, scans only download what changed since the last one
+        self.map_cache = MapCellCache()
         self.pokestop = {}
         self.wild_pokemon = []
+        self.wild_pokemon_range = wild_pokemon_range
+
+        # positions of what the scans found, for radius and nearest queries in metres
+        self.fort_index = SpatialIndex()
+        self.pokestop_index = SpatialIndex()
+        self.spawn_point_index = SpatialIndex()
+        self.wild_pokemon_index = SpatialIndex()
+        self._wild_pokemon_hides = {}
+
+        self.world_store = world_store
+        if world_store is not None:
+            world_store.load(self.map_cache)
+            for map_cell in self.map_cache.get_cells():
+                self._index_map_cell(MyDict(map_cell))
+            self._expire_wild_pokemon()
 
     def get_pokestop(self):
         return self.pokestop.values()
@@ -187,6 +233,18 @@ class Client:
     def get_wild_pokemon(self):
         return self.wild_pokemon[:]
 
+    def get_pokestop_near(self, radius):
+        return [pokestop for _, _, pokestop in self.pokestop_index.query_radius(self._lat, self._lng, radius)]
+
+    def get_nearest_pokestop(self, k=1):
+        return [pokestop for _, _, pokestop in self.pokestop_index.nearest(self._lat, self._lng, k)]
+
+    def get_wild_pokemon_near(self, radius):
+        return [wild_pokemon for _, _, wild_pokemon in self.wild_pokemon_index.query_radius(self._lat, self._lng, radius)]
+
+    def get_nearest_wild_pokemon(self, k=1):
+        return [wild_pokemon for _, _, wild_pokemon in self.wild_pokemon_index.nearest(self._lat, self._lng, k)]
+
     def get_position(self):
         return (self._lat, self._lng)
 
@@ -274,35 +332,38 @@ class Client:
     # Send request and parse response
     def _call(self):
 
-        time.sleep(0.34)
-        # Call api
-        resp = self._req.call()
+        # Call api (spaced by the rate limiter of the api), throttled calls are retried for up to 30s
+        resp = self._req.call(deadline=30)
         self._req = self._api.create_request()
         self._req.set_position(self._lat, self._lng, self._alt)
-        log.debug('Response dictionary: \n\r{}'.format(
-            pprint.PrettyPrinter(indent=2, width=3).pformat(resp)))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Response dictionary: \n\r{}'.format(
+                pprint.PrettyPrinter(indent=2, width=3).pformat(resp)))
 
         if not resp:
             return
 
-        responses = MyDict(resp)['responses']
+        responses = MyResponses(resp['responses'])
 
         # GET_PLAYER
         if responses['GET_PLAYER']['success'] is True:
             self.profile.update(responses['GET_PLAYER']['player_data'])
 
         # GET_MAP_OBJECTS
-        for map_cell in responses['GET_MAP_OBJECTS']['map_cells']:
-            map_cell = MyDict(map_cell)
-
-            for fort in map_cell['forts']:
-                fort = MyDict(fort)
-                if fort['type'] == 1:
-                    self.pokestop[fort['id']] = fort
-                    # log.debug('POKESTOP = {}'.format(fort))
-
-            for wild_pokemon in map_cell['wild_pokemons']:
-                self.wild_pokemon.append(wild_pokemon)
+        if responses['GET_MAP_OBJECTS']:
+            for map_cell in self.map_cache.apply(responses['GET_MAP_OBJECTS']):
+                self._index_map_cell(MyDict(map_cell))
+
+            # only what this scan returned, in one transaction
+            if self.world_store is not None and responses['GET_MAP_OBJECTS']['status'] == 1:
+                self.world_store.save_map_cells(responses['GET_MAP_OBJECTS']['map_cells'])
+
+            # the index also holds pokemon seen from earlier positions
+            self._expire_wild_pokemon()
+            if self.wild_pokemon_range is None:
+                self.wild_pokemon = self.get_nearest_wild_pokemon(len(self.wild_pokemon_index))
+            else:
+                self.wild_pokemon = self.get_wild_pokemon_near(self.wild_pokemon_range)
 
         # FORT_SEARCH
         if responses['FORT_SEARCH']:
@@ -319,51 +380,17 @@ class Client:
 
         # GET_INVENTORY
         if responses['GET_INVENTORY']['success']:
-            for inventory_item in responses['GET_INVENTORY']['inventory_delta']['inventory_items']:
-                inventory_item = MyDict(inventory_item)
-
-                if inventory_item['deleted_item_key']:
-                    log.warning('*** captured deleted_item_key in inventory')
-                    log.warning(inventory_item)
-
-                # Item
-                item_id = inventory_item['inventory_item_data']['item']['item_id']
-                count = inventory_item['inventory_item_data']['item']['count']
-                if item_id and count:
-                    self.item[item_id] = count
-                    self.profile['cnt_item'] += count
-                    # log.debug('ITEM {} = {}'.format(item, count))
-
-                # Stats
-                player_stats = inventory_item['inventory_item_data']['player_stats']
-                self.profile.update(player_stats)
-                # log.debug('PROFILE {}'.format(self.profile))
-
-                # Pokemon
-                pokemon = inventory_item['inventory_item_data']['pokemon_data']
-                if pokemon['cp']:
-                    self._calc_attr(pokemon)
-                    self.family[POKEDEX[pokemon['pokemon_id']]['family_id']].append(pokemon)
-                    self.profile['cnt_pokemon'] += 1
-
-                elif pokemon['is_egg'] is True:
-                    self.egg.append(pokemon)
-
-                # Candy
-                candy = inventory_item['inventory_item_data']['candy']
-                family_id = candy['family_id']
-                count = candy['candy']
-                if count and family_id:
-                    self.candy[family_id] = count
-
-                # Incubators
-                egg_incubators = inventory_item['inventory_item_data']['egg_incubators']['egg_incubator']
-                if egg_incubators:
-                    for egg_incubator in egg_incubators:
-                        self.incubator[egg_incubator['id']] = egg_incubator
+            changes = self.inventory.apply(responses['GET_INVENTORY']['inventory_delta'])
+            eggs_changed = False
+            for key, old, new in changes:
+                if old is not None:
+                    eggs_changed |= self._remove_inventory_item(MyDict(old))
+                if new is not None:
+                    eggs_changed |= self._add_inventory_item(MyDict(new))
 
             # Sort egg by km
-            self.egg.sort(reverse=True, key=lambda e: e['egg_km_walked_target'])
+            if eggs_changed:
+                self.egg.sort(reverse=True, key=lambda e: e['egg_km_walked_target'])
 
         # DISK_ENCOUNTER
         if 'DISK_ENCOUNTER' in responses:
@@ -397,6 +424,10 @@ class Client:
                 log.warning('ENCOUNTER = {}')
 
             if responses['ENCOUNTER']['status'] == 1:
+                if self.world_store is not None:
+                    self.world_store.save_encounter(
+                        responses['ENCOUNTER']['wild_pokemon']['encounter_id'],
+                        responses['ENCOUNTER']['wild_pokemon']['pokemon_data'])
                 pokemon = responses['ENCOUNTER']['wild_pokemon']['pokemon_data']
                 self._calc_attr(pokemon)
                 log.info('ENCOUNTER = "{}", PROB = {}'.format(
@@ -481,6 +512,95 @@ class Client:
             log.info('USE_ITEM_XP_BOOST result = {}'.format(
                 UseItemXpBoostResponse.Result.Name(responses['USE_ITEM_XP_BOOST']['result'])))
 
+    def _index_map_cell(self, map_cell):
+        for fort_id in map_cell['deleted_objects']:
+            self.pokestop.pop(fort_id, None)
+            self.pokestop_index.remove(fort_id)
+            self.fort_index.remove(fort_id)
+
+        for fort in map_cell['forts']:
+            fort = MyDict(fort)
+            self.fort_index.insert(fort['id'], fort['latitude'], fort['longitude'], fort)
+            if fort['type'] == 1:
+                self.pokestop[fort['id']] = fort
+                self.pokestop_index.insert(fort['id'], fort['latitude'], fort['longitude'], fort)
+                # log.debug('POKESTOP = {}'.format(fort))
+
+        for spawn_point in map_cell['spawn_points']:
+            position = (spawn_point['latitude'], spawn_point['longitude'])
+            self.spawn_point_index.insert(position, position[0], position[1], spawn_point)
+
+        for wild_pokemon in map_cell['wild_pokemons']:
+            self.wild_pokemon_index.insert(wild_pokemon['encounter_id'], wild_pokemon['latitude'], wild_pokemon['longitude'], wild_pokemon)
+            self._wild_pokemon_hides[wild_pokemon['encounter_id']] = wild_pokemon['hides_at_ms']
+
+    def _expire_wild_pokemon(self):
+        now_ms = get_time_ms()
+        for encounter_id, hides_at_ms in list(self._wild_pokemon_hides.items()):
+            if hides_at_ms <= now_ms:
+                del self._wild_pokemon_hides[encounter_id]
+                self.wild_pokemon_index.remove(encounter_id)
+
+    # Derived inventory data, returns whether the eggs changed
+    def _add_inventory_item(self, inventory_item_data):
+
+        # Item
+        item_id = inventory_item_data['item']['item_id']
+        count = inventory_item_data['item']['count']
+        if item_id and count:
+            self.item[item_id] = count
+            self.profile['cnt_item'] += count
+
+        # Stats
+        self.profile.update(inventory_item_data['player_stats'])
+
+        # Pokemon
+        pokemon = inventory_item_data['pokemon_data']
+        if pokemon['cp']:
+            self._calc_attr(pokemon)
+            self.family[pokemon['family_id']].append(pokemon)
+            self.profile['cnt_pokemon'] += 1
+
+        elif pokemon['is_egg'] is True:
+            self.egg.append(pokemon)
+            return True
+
+        # Candy
+        candy = inventory_item_data['candy']
+        if candy['candy'] and candy['family_id']:
+            self.candy[candy['family_id']] = candy['candy']
+
+        # Incubators
+        for egg_incubator in inventory_item_data['egg_incubators']['egg_incubator'] or []:
+            self.incubator[egg_incubator['id']] = egg_incubator
+
+        return False
+
+    def _remove_inventory_item(self, inventory_item_data):
+
+        item_id = inventory_item_data['item']['item_id']
+        if item_id and item_id in self.item:
+            self.profile['cnt_item'] -= self.item.pop(item_id)
+
+        pokemon = inventory_item_data['pokemon_data']
+        if pokemon['cp']:
+            family_id = POKEDEX[pokemon['pokemon_id']]['family_id']
+            self.family[family_id] = [p for p in self.family[family_id] if p['id'] != pokemon['id']]
+            self.profile['cnt_pokemon'] -= 1
+
+        elif pokemon['is_egg'] is True:
+            self.egg = [e for e in self.egg if e['id'] != pokemon['id']]
+            return True
+
+        family_id = inventory_item_data['candy']['family_id']
+        if family_id:
+            self.candy.pop(family_id, None)
+
+        for egg_incubator in inventory_item_data['egg_incubators']['egg_incubator'] or []:
+            self.incubator.pop(egg_incubator['id'], None)
+
+        return False
+
     @chain_api
     def bulk_recycle_inventory_item(self):
 
@@ -723,6 +843,9 @@ class Client:
 
         for family_id in range(1, POKEMON_ID_MAX + 1):
             for pokemon in self.family[family_id]:
+                # pokemon are kept across scans, decide again
+                for flag in ('isKeepMax', 'isKeepEvo', 'isKeepCp'):
+                    pokemon.pop(flag, None)
                 self._calc_attr_detail(pokemon)
 
         release_cnt = 0
@@ -861,8 +984,8 @@ class Client:
     def scan(self):
         self.use_item_egg_incubator()
         self.wild_pokemon = []
-        cell_ids = self._get_cell_ids()
-        timestamps = [0, ] * len(cell_ids)
+        cell_ids = get_cell_ids(self._lat, self._lng)
+        timestamps = self.map_cache.get_since_timestamps(cell_ids)
         self._get_player()
         self._get_inventory()
         self._get_hatched_eggs()
@@ -995,6 +1118,11 @@ class Client:
 
             app_simulation=False, auth_token=auth_token)
         if ret:
+            # requests created before the login do not carry the auth provider
+            self._req = self._api.create_request()
+            self._req.set_position(self._lat, self._lng, self._alt)
+            # renew token and auth ticket in the background instead of running into NotLoggedInException
+            self._api.enable_auth_refresh()
             self.scan()
         return ret
 
@@ -1011,32 +1139,8 @@ class Client:
         self._req.get_hatched_eggs()
 
     def _get_inventory(self):
-        self.egg = []
-        self.incubator = {}
-        self.profile['cnt_pokemon'] = 0
-        self.profile['cnt_item'] = 0
-        self.family = defaultdict(list)
-        self.candy = defaultdict(int)
-        self.item = defaultdict(int)
-        self._req.get_inventory()
-
-    def _get_cell_ids(self, radius=10):
-        lat = self._lat
-        lng = self._lng
-        origin = CellId.from_lat_lng(LatLng.from_degrees(lat, lng)).parent(15)
-        walk = [origin.id()]
-        right = origin.next()
-        left = origin.prev()
-
-        # Search around provided radius
-        for i in range(radius):
-            walk.append(right.id())
-            walk.append(left.id())
-            right = right.next()
-            left = left.prev()
-
-        # Return everything
-        return sorted(walk)
+        # only changes since the last response are sent back
+        self._req.get_inventory(last_timestamp_ms=self.inventory.get_timestamp())
 
     def _encode(self, cellid):
         output = []
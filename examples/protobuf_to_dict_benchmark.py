@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+import os
+import sys
+import timeit
+import random
+import argparse
+
+# add parent directory to PATH, so that the package will be found
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from pgoapi.protobuf_to_dict import protobuf_to_dict, fast_protobuf_to_dict
+
+from pgoapi import protos
+from POGOProtos.Networking.Responses_pb2 import GetInventoryResponse, GetMapObjectsResponse
+
+
+def build_inventory(pokemons=250, items=350):
+    response = GetInventoryResponse(success=True)
+    delta = response.inventory_delta
+    delta.original_timestamp_ms = 1469000000000
+    delta.new_timestamp_ms = 1469000500000
+
+    for i in range(pokemons):
+        entry = delta.inventory_items.add(modified_timestamp_ms=1469000000000 + i)
+        pokemon = entry.inventory_item_data.pokemon_data
+        pokemon.id = random.getrandbits(63)
+        pokemon.pokemon_id = random.randint(1, 151)
+        pokemon.cp = random.randint(10, 2000)
+        pokemon.stamina = pokemon.stamina_max = random.randint(10, 200)
+        pokemon.move_1 = 214
+        pokemon.move_2 = 32
+        pokemon.height_m = random.random()
+        pokemon.weight_kg = random.random() * 100
+        pokemon.individual_attack = random.randint(0, 15)
+        pokemon.individual_defense = random.randint(0, 15)
+        pokemon.individual_stamina = random.randint(0, 15)
+        pokemon.cp_multiplier = random.random()
+        pokemon.pokeball = 1
+        pokemon.captured_cell_id = random.getrandbits(63)
+        pokemon.creation_time_ms = 1469000000000 + i
+        pokemon.nickname = 'poke-{}'.format(i)
+
+    # items are stacked per item id, the count holds the number of items
+    item_ids = [1, 2, 3, 101, 102, 103, 104, 201, 202, 301, 401, 501, 701, 901, 902]
+    for item_id in item_ids:
+        item = delta.inventory_items.add().inventory_item_data.item
+        item.item_id = item_id
+        item.count = items // len(item_ids)
+
+    for family_id in range(1, 152, 2):
+        candy = delta.inventory_items.add().inventory_item_data.candy
+        candy.family_id = family_id
+        candy.candy = random.randint(1, 300)
+
+    for pokemon_id in range(1, 152):
+        entry = delta.inventory_items.add().inventory_item_data.pokedex_entry
+        entry.pokemon_id = pokemon_id
+        entry.times_encountered = random.randint(1, 50)
+        entry.times_captured = random.randint(1, 50)
+
+    stats = delta.inventory_items.add().inventory_item_data.player_stats
+    stats.level = 20
+    stats.experience = 200000
+
+    return response
+
+
+def build_map_objects(cells=21, forts=4, spawn_points=10, wild_pokemons=2, nearby_pokemons=3):
+    response = GetMapObjectsResponse(status=1)
+
+    for c in range(cells):
+        cell = response.map_cells.add(s2_cell_id=random.getrandbits(63), current_timestamp_ms=1469000000000)
+        for f in range(forts):
+            fort = cell.forts.add(id='fort-{}-{}'.format(c, f), last_modified_timestamp_ms=1469000000000,
+                                  latitude=random.uniform(-90, 90), longitude=random.uniform(-180, 180),
+                                  enabled=True, type=f % 2)
+            if f == 0:
+                fort.active_fort_modifier = b'\x01\x02'
+                fort.lure_info.fort_id = fort.id
+                fort.lure_info.encounter_id = random.getrandbits(63)
+                fort.lure_info.active_pokemon_id = 16
+        for _ in range(spawn_points):
+            cell.spawn_points.add(latitude=random.uniform(-90, 90), longitude=random.uniform(-180, 180))
+        for w in range(wild_pokemons):
+            wild = cell.wild_pokemons.add(encounter_id=random.getrandbits(63), latitude=random.uniform(-90, 90),
+                                          longitude=random.uniform(-180, 180), spawn_point_id='sp-{}-{}'.format(c, w),
+                                          time_till_hidden_ms=random.randint(0, 900000))
+            wild.pokemon_data.pokemon_id = random.randint(1, 151)
+            cell.catchable_pokemons.add(spawn_point_id=wild.spawn_point_id, encounter_id=wild.encounter_id,
+                                        pokemon_id=wild.pokemon_data.pokemon_id, latitude=wild.latitude,
+                                        longitude=wild.longitude)
+        for _ in range(nearby_pokemons):
+            cell.nearby_pokemons.add(pokemon_id=random.randint(1, 151), distance_in_meters=random.random() * 200,
+                                     encounter_id=random.getrandbits(63))
+
+    return response
+
+
+def bench(name, message, number):
+    raw = message.SerializeToString()
+    parsed = message.__class__()
+    parsed.ParseFromString(raw)
+
+    for use_enum_labels in (False, True):
+        assert protobuf_to_dict(parsed, use_enum_labels=use_enum_labels) == fast_protobuf_to_dict(parsed, use_enum_labels=use_enum_labels)
+
+    old = min(timeit.repeat(lambda: protobuf_to_dict(parsed), number=number, repeat=3)) / number
+    new = min(timeit.repeat(lambda: fast_protobuf_to_dict(parsed), number=number, repeat=3)) / number
+
+    print('{:<28} {:>8} bytes  protobuf_to_dict {:8.3f} ms  fast_protobuf_to_dict {:8.3f} ms  ({:.1f}x)'.format(
+        name, len(raw), old * 1000, new * 1000, old / new))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", help="Conversions per measurement", type=int, default=200)
+    config = parser.parse_args()
+
+    random.seed(0)
+    bench('GetInventoryResponse', build_inventory(), config.number)
+    bench('GetMapObjectsResponse (21)', build_map_objects(), config.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+import os
+import sys
+import threading
+import argparse
+
+# add parent directory to PATH, so that the package will be found
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from pgoapi.rpc_api import RpcApi
+
+
+def worker(apis, index, number, start, results):
+    ids = results[index]
+    start.wait()
+    for i in range(number):
+        # threads share RpcApi instances as well as calling their own ones
+        ids.append(apis[(index + i) % len(apis)].get_rpc_id())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", "--threads", help="Concurrent threads", type=int, default=64)
+    parser.add_argument("-n", "--number", help="Request ids per thread", type=int, default=20000)
+    parser.add_argument("-a", "--apis", help="RpcApi instances shared by the threads", type=int, default=8)
+    config = parser.parse_args()
+
+    apis = [RpcApi(None) for _ in range(config.apis)]
+    results = [[] for _ in range(config.threads)]
+    start = threading.Event()
+
+    threads = [threading.Thread(target=worker, args=(apis, i, config.number, start, results)) for i in range(config.threads)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+
+    ids = [rpc_id for thread_ids in results for rpc_id in thread_ids]
+    unique = len(set(ids))
+    print('{} threads  {} request ids  {} unique'.format(config.threads, len(ids), unique))
+
+    if unique != len(ids):
+        print('FAILED: {} duplicate request ids'.format(len(ids) - unique))
+        sys.exit(1)
+
+    # ids come from one process wide counter, so the ids seen by one thread keep increasing
+    for thread_ids in results:
+        if any(a >= b for a, b in zip(thread_ids, thread_ids[1:])):
+            print('FAILED: request ids not increasing within a thread')
+            sys.exit(1)
+
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
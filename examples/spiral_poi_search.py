@@ -28,7 +28,6 @@ import os
 import re
 import sys
 import json
-import time
 import struct
 import random
 import logging
@@ -39,10 +38,12 @@ import pprint
 from pgoapi import PGoApi
 from pgoapi.utilities import f2i, h2f
 from pgoapi import utilities as util
+from pgoapi.map_cache import MapCellCache
+from pgoapi.cell_cover import get_cell_ids
 
 from google.protobuf.internal import encoder
 from geopy.geocoders import GoogleV3
-from s2sphere import Cell, CellId, LatLng
+from s2sphere import Cell
 
 log = logging.getLogger(__name__)
 
@@ -57,22 +58,6 @@ def get_pos_by_name(location_name):
 
     return (loc.latitude, loc.longitude, loc.altitude)
 
-def get_cell_ids(lat, long, radius = 10):
-    origin = CellId.from_lat_lng(LatLng.from_degrees(lat, long)).parent(15)
-    walk = [origin.id()]
-    right = origin.next()
-    left = origin.prev()
-
-    # Search around provided radius
-    for i in range(radius):
-        walk.append(right.id())
-        walk.append(left.id())
-        right = right.next()
-        left = left.prev()
-
-    # Return everything
-    return sorted(walk)
-
 def encode(cellid):
     output = []
     encoder._VarintEncoder()(output.append, cellid)
@@ -160,6 +145,8 @@ def main():
 
 def find_poi(api, lat, lng):
     poi = {'pokemons': {}, 'forts': []}
+    # neighbouring spiral steps share most of their cells, only changes are downloaded again
+    map_cache = MapCellCache()
     step_size = 0.0015
     step_limit = 49
     coords = generate_spiral(lat, lng, step_size, step_limit)
@@ -169,22 +156,19 @@ def find_poi(api, lat, lng):
         api.set_position(lat, lng, 0)
 
         
-        #get_cellid was buggy -> replaced through get_cell_ids from pokecli
-        #timestamp gets computed a different way:
         cell_ids = get_cell_ids(lat, lng)
-        timestamps = [0,] * len(cell_ids)
+        timestamps = map_cache.get_since_timestamps(cell_ids)
         response_dict = api.get_map_objects(latitude = util.f2i(lat), longitude = util.f2i(lng), since_timestamp_ms = timestamps, cell_id = cell_ids)
         if (response_dict['responses']):
-            if 'status' in response_dict['responses']['GET_MAP_OBJECTS']:
-                if response_dict['responses']['GET_MAP_OBJECTS']['status'] == 1:
-                    for map_cell in response_dict['responses']['GET_MAP_OBJECTS']['map_cells']:
-                        if 'wild_pokemons' in map_cell:
-                            for pokemon in map_cell['wild_pokemons']:
-                                pokekey = get_key_from_pokemon(pokemon)
-                                pokemon['hides_at'] = time.time() + pokemon['time_till_hidden_ms']/1000
-                                poi['pokemons'][pokekey] = pokemon
+            if 'GET_MAP_OBJECTS' in response_dict['responses']:
+                for map_cell in map_cache.apply(response_dict['responses']['GET_MAP_OBJECTS']):
+                    for pokemon in map_cell['wild_pokemons']:
+                        pokekey = get_key_from_pokemon(pokemon)
+                        pokemon['hides_at'] = pokemon['hides_at_ms'] / 1000.0
+                        poi['pokemons'][pokekey] = pokemon
 
         # time.sleep(0.51)
+    poi['forts'] = map_cache.get_forts()
     # new dict, binary data
     # print('POI dictionary: \n\r{}'.format(json.dumps(poi, indent=2)))
     print('POI dictionary: \n\r{}'.format(pprint.PrettyPrinter(indent=4).pformat(poi)))
@@ -53,10 +53,27 @@ from pgoapi.auth import Auth
 
 logging.getLogger("pgoapi").addHandler(logging.NullHandler())
 logging.getLogger("rpc_api").addHandler(logging.NullHandler())
+logging.getLogger("responses").addHandler(logging.NullHandler())
+logging.getLogger("transport").addHandler(logging.NullHandler())
+logging.getLogger("wire_capture").addHandler(logging.NullHandler())
+logging.getLogger("aio").addHandler(logging.NullHandler())
+logging.getLogger("rate_limit").addHandler(logging.NullHandler())
+logging.getLogger("throttle").addHandler(logging.NullHandler())
+logging.getLogger("circuit_breaker").addHandler(logging.NullHandler())
+logging.getLogger("coalesce").addHandler(logging.NullHandler())
+logging.getLogger("account_pool").addHandler(logging.NullHandler())
+logging.getLogger("standin").addHandler(logging.NullHandler())
 logging.getLogger("utilities").addHandler(logging.NullHandler())
 logging.getLogger("auth").addHandler(logging.NullHandler())
 logging.getLogger("auth_ptc").addHandler(logging.NullHandler())
 logging.getLogger("auth_google").addHandler(logging.NullHandler())
+logging.getLogger("auth_refresh").addHandler(logging.NullHandler())
+logging.getLogger("token_store").addHandler(logging.NullHandler())
+logging.getLogger("inventory").addHandler(logging.NullHandler())
+logging.getLogger("map_cache").addHandler(logging.NullHandler())
+logging.getLogger("cell_cover").addHandler(logging.NullHandler())
+logging.getLogger("spatial_index").addHandler(logging.NullHandler())
+logging.getLogger("world_store").addHandler(logging.NullHandler())
 
 try:
     import requests.packages.urllib3
@@ -0,0 +1,290 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+from pgoapi.pgoapi import PGoApi
+from pgoapi.exceptions import AuthException, NotLoggedInException, ServerSideRequestThrottlingException, \
+    ServerBusyOrOfflineException, CircuitOpenException, HttpStatusException, PleaseInstallFutures
+
+
+class Account:
+
+    NEW = 'new'
+    READY = 'ready'
+    COOLDOWN = 'cooldown'
+    LOGGED_OUT = 'logged_out'
+    FAILED = 'failed'
+
+    def __init__(self, provider, username, password, auth_token = None, position = None):
+        self.provider = provider
+        self.username = username
+        self.password = password
+        self.auth_token = auth_token
+        self.position = position
+
+        self.api = None
+        self.state = self.NEW
+
+        self.active_jobs = 0
+        self.jobs_done = 0
+        self.errors = 0
+        self.throttled = 0
+        self.last_used = 0
+        self.cooldown_until = 0
+
+    def get_ticket_expire(self):
+        # ms timestamp of the auth ticket expiry, None before the first call
+        if self.api is None or self.api._auth_provider is None:
+            return None
+        return self.api._auth_provider.get_ticket_expire()
+
+    def get_rate(self):
+        # current request rate of the AIMD throttle, None if the api has none
+        throttle = self.api.get_throttle() if self.api is not None else None
+        if throttle is None:
+            return None
+        return throttle.get_rate(self.api.get_api_endpoint())
+
+    def is_available(self, now = None):
+        if self.state == self.COOLDOWN and (now or time.time()) >= self.cooldown_until:
+            self.state = self.READY
+        return self.state == self.READY
+
+    def get_status(self):
+        return {'username': self.username,
+                'state': self.state,
+                'active_jobs': self.active_jobs,
+                'jobs_done': self.jobs_done,
+                'errors': self.errors,
+                'throttled': self.throttled,
+                'cooldown_until': self.cooldown_until,
+                'ticket_expire_ms': self.get_ticket_expire(),
+                'rate': self.get_rate()}
+
+    def __repr__(self):
+        return '<Account {} ({})>'.format(self.username, self.state)
+
+
+class AccountPool:
+
+    """
+    Logs in a set of accounts and hands out the least loaded available one per job. Throttled
+    accounts cool down for throttle_cooldown seconds, accounts failing max_errors jobs in a row for
+    error_cooldown seconds, logged out ones are logged in again in the background.
+    """
+
+    # job errors which say something about the account (and not about the job)
+    ACCOUNT_ERRORS = (ServerBusyOrOfflineException, HttpStatusException, CircuitOpenException)
+
+    # errors of a login attempt which are reported as failed login
+    LOGIN_ERRORS = (AuthException, ServerBusyOrOfflineException, NotLoggedInException, HttpStatusException, CircuitOpenException)
+
+    def __init__(self, api_factory = PGoApi, max_workers = 10, position = None, app_simulation = True,
+                 max_jobs_per_account = 1, max_errors = 3, error_cooldown = 60, throttle_cooldown = 30, login_workers = 10,
+                 auth_refresher = None):
+        self.log = logging.getLogger(__name__)
+
+        self._api_factory = api_factory
+        self._position = position
+        self._app_simulation = app_simulation
+        self._max_jobs_per_account = max_jobs_per_account
+        self._max_errors = max_errors
+        self._error_cooldown = error_cooldown
+        self._throttle_cooldown = throttle_cooldown
+
+        self._cond = threading.Condition()
+        self._accounts = []
+        self._max_workers = max_workers
+        self._login_workers = login_workers
+        # pgoapi.auth_refresh.AuthRefresher renewing tokens and tickets of the logged in accounts
+        self._auth_refresher = auth_refresher
+        self._executor = None
+        self._login_executor = None
+
+    def _create_executor(self, workers):
+        # concurrent.futures is part of Python 3, Python 2 needs the futures backport
+        if ThreadPoolExecutor is None:
+            raise PleaseInstallFutures()
+        return ThreadPoolExecutor(workers)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = self._create_executor(self._max_workers)
+        return self._executor
+
+    def _get_login_executor(self):
+        # own threads for logins, job workers waiting for an account must not block them
+        if self._login_executor is None:
+            self._login_executor = self._create_executor(self._login_workers)
+        return self._login_executor
+
+    def add_account(self, provider, username, password, auth_token = None, position = None):
+        account = Account(provider, username, password, auth_token, position)
+        with self._cond:
+            self._accounts.append(account)
+        return account
+
+    def get_accounts(self):
+        return list(self._accounts)
+
+    def _get_login_args(self, account):
+        if account.api is None:
+            account.api = self._api_factory()
+
+        lat, lng, alt = account.position or self._position or (None, None, None)
+        return (account.provider, account.username, account.password, lat, lng, alt)
+
+    def _login(self, account):
+        args = self._get_login_args(account)
+        try:
+            ok = account.api.login(*args, app_simulation = self._app_simulation, auth_token = account.auth_token)
+            if not ok and account.auth_token is not None:
+                # the cached token did not work out, fall back to username/password
+                account.auth_token = None
+                ok = account.api.login(*args, app_simulation = self._app_simulation)
+        except self.LOGIN_ERRORS as e:
+            self.log.warning('Login of %s failed: %s', account.username, repr(e))
+            ok = False
+
+        return self._login_done(account, ok)
+
+    def _login_done(self, account, ok):
+        if ok and self._auth_refresher is not None:
+            account.api.enable_auth_refresh(self._auth_refresher)
+
+        with self._cond:
+            account.state = Account.READY if ok else Account.FAILED
+            account.errors = 0
+            self._cond.notify_all()
+
+        self.log.info('Login of %s %s', account.username, 'successful' if ok else 'failed')
+        return ok
+
+    def _get_logged_out(self):
+        return [account for account in self.get_accounts() if account.state in (Account.NEW, Account.FAILED, Account.LOGGED_OUT)]
+
+    def _count_ready(self):
+        return len([account for account in self.get_accounts() if account.state == Account.READY])
+
+    def login_all(self):
+        # concurrent login of all accounts not ready yet, returns the number of ready accounts
+        list(self._get_login_executor().map(self._login, self._get_logged_out()))
+        return self._count_ready()
+
+    def _pick(self):
+        now = time.time()
+        candidates = [account for account in self._accounts
+                      if account.is_available(now) and account.active_jobs < self._max_jobs_per_account]
+        if not candidates:
+            return None
+
+        # least loaded first, the longest unused one among those
+        account = min(candidates, key=lambda account: (account.active_jobs, account.last_used))
+        account.active_jobs += 1
+        account.last_used = now
+        return account
+
+    def acquire(self, timeout = None):
+        # blocks until an account is available, None on timeout
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._cond:
+            while True:
+                account = self._pick()
+                if account is not None:
+                    return account
+
+                # cooldowns end without anybody notifying
+                wait = 1.0
+                if deadline is not None:
+                    wait = min(wait, deadline - time.time())
+                    if wait <= 0:
+                        return None
+                self._cond.wait(wait)
+
+    def release(self, account, error = None):
+        relogin = False
+        with self._cond:
+            account.active_jobs -= 1
+
+            if error is None:
+                account.jobs_done += 1
+                account.errors = 0
+            elif isinstance(error, ServerSideRequestThrottlingException):
+                account.throttled += 1
+                self._cooldown(account, self._throttle_cooldown)
+            elif isinstance(error, NotLoggedInException):
+                relogin = account.state != Account.LOGGED_OUT
+                account.state = Account.LOGGED_OUT
+            elif isinstance(error, self.ACCOUNT_ERRORS):
+                account.errors += 1
+                if account.errors >= self._max_errors:
+                    self._cooldown(account, self._error_cooldown)
+
+            self._cond.notify_all()
+
+        if relogin:
+            self.log.info('Account %s got logged out - logging in again', account.username)
+            self._relogin(account)
+
+    def _relogin(self, account):
+        self._get_login_executor().submit(self._login, account)
+
+    def _cooldown(self, account, seconds):
+        account.state = Account.COOLDOWN
+        account.cooldown_until = max(account.cooldown_until, time.time() + seconds)
+        self.log.info('Account %s cooling down for %ss', account.username, seconds)
+
+    def _run(self, job, args, kwargs):
+        account = self.acquire()
+        error = None
+        try:
+            return job(account.api, *args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(account, error)
+
+    def submit(self, job, *args, **kwargs):
+        # runs job(api, *args, **kwargs) with the next available account in the worker threads
+        return self._get_executor().submit(self._run, job, args, kwargs)
+
+    def get_status(self):
+        return [account.get_status() for account in self.get_accounts()]
+
+    def close(self):
+        for executor in (self._executor, self._login_executor):
+            if executor is not None:
+                executor.shutdown()
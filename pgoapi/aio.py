@@ -0,0 +1,505 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import asyncio
+import logging
+import threading
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from pgoapi.pgoapi import PGoApi, PGoApiRequest
+from pgoapi.coalesce import CoalescingDispatcher
+from pgoapi.account_pool import AccountPool
+from pgoapi.auth_refresh import get_default_refresher
+from pgoapi.rpc_api import RpcApi
+from pgoapi.transport import HttpTransport
+from pgoapi.exceptions import AuthException, NotLoggedInException, ServerBusyOrOfflineException, ServerSideRequestThrottlingException, PleaseInstallAiohttp
+
+from . import protos
+from POGOProtos.Networking.Requests_pb2 import RequestType
+
+
+class AsyncTransport:
+
+    # coroutine version of Transport.send, returns (http status code, response body)
+    async def send(self, endpoint, data):
+        raise NotImplementedError()
+
+    async def close(self):
+        pass
+
+
+class AiohttpTransport(AsyncTransport):
+
+    USER_AGENT = HttpTransport.USER_AGENT
+
+    def __init__(self, pool_size = 100, pool_size_per_host = 0, timeout = 30):
+        if aiohttp is None:
+            raise PleaseInstallAiohttp()
+
+        self.log = logging.getLogger(__name__)
+
+        # pool_size: open connections over all hosts, pool_size_per_host: 0 = no own limit per host,
+        # timeout: seconds until a hanging request is given up
+        self._pool_size = pool_size
+        self._pool_size_per_host = pool_size_per_host
+        self._timeout = timeout
+
+        self._session = None
+
+    def _create_session(self):
+        connector = aiohttp.TCPConnector(limit=self._pool_size, limit_per_host=self._pool_size_per_host)
+        session = aiohttp.ClientSession(connector=connector, headers={'User-Agent': self.USER_AGENT},
+                                        timeout=aiohttp.ClientTimeout(total=self._timeout))
+
+        self.log.debug('Created aiohttp session (pool size: %s, per host: %s)', self._pool_size, self._pool_size_per_host)
+        return session
+
+    def get_session(self):
+        # created on first use, a session is bound to the event loop running at that time
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    async def send(self, endpoint, data):
+        session = self.get_session()
+        try:
+            async with session.post(endpoint, data=data) as response:
+                return (response.status, await response.read())
+        except asyncio.TimeoutError:
+            self.log.debug('Timeout on %s', endpoint)
+            raise ServerBusyOrOfflineException
+        except aiohttp.ClientConnectionError as e:
+            self.log.debug('Connection error on %s (%s)', endpoint, str(e))
+            raise ServerBusyOrOfflineException
+
+    async def close(self):
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+
+class ExecutorTransport(AsyncTransport):
+
+    """ Runs a blocking Transport in an executor, non-blocking ones (e.g. the in-process stand-in) are called directly """
+
+    def __init__(self, transport, executor = None):
+        self._transport = transport
+        self._executor = executor
+
+    async def send(self, endpoint, data):
+        if not self._transport.blocking:
+            return self._transport.send(endpoint, data)
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, self._transport.send, endpoint, data)
+
+    async def close(self):
+        self._transport.close()
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_async_transport():
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = AiohttpTransport()
+    return _default_transport
+
+
+def set_default_async_transport(transport):
+    global _default_transport
+    with _default_transport_lock:
+        _default_transport = transport
+
+
+class AsyncRpcApi(RpcApi):
+
+    async def _make_rpc(self, endpoint, request_proto_serialized):
+        self.log.debug('Execution of RPC')
+
+        if self._wire_capture:
+            self._wire_capture.write_request(request_proto_serialized)
+
+        status_code, content = await self._transport.send(endpoint, request_proto_serialized)
+
+        if self._wire_capture:
+            self._wire_capture.write_response(content)
+
+        return (status_code, content)
+
+    async def request(self, endpoint, subrequests, player_position, request_id = None):
+
+        if not self._auth_provider or self._auth_provider.is_login() is False:
+            raise NotLoggedInException()
+
+        request_proto = self._build_main_request(subrequests, player_position, request_id)
+        status_code, content = await self._make_rpc(endpoint, request_proto)
+
+        return self._handle_main_response(status_code, content, subrequests)
+
+
+class AsyncPGoApi(PGoApi):
+
+    """
+    asyncio variant of PGoApi - RPC calls are coroutines, e.g. await api.get_player(),
+    so one event loop can serve many accounts instead of one thread per account.
+    """
+
+    def __init__(self, transport = None, pool_size = None, typed_responses = False, timeout = None, rate_limiter = None, throttle = None, retry_policy = None, endpoint_health = None, token_store = None):
+
+        # all instances share one aiohttp session unless an own transport is requested
+        if transport is None:
+            transport = AiohttpTransport(pool_size) if pool_size is not None else get_default_async_transport()
+        elif not isinstance(transport, AsyncTransport):
+            transport = ExecutorTransport(transport)
+
+        PGoApi.__init__(self, transport = transport, typed_responses = typed_responses, rate_limiter = rate_limiter, throttle = throttle, retry_policy = retry_policy, endpoint_health = endpoint_health, token_store = token_store)
+
+        # seconds per call (None = no timeout), can be overridden by call(timeout=...)
+        self._timeout = timeout
+
+    def get_timeout(self):
+        return self._timeout
+
+    def set_timeout(self, timeout):
+        self._timeout = timeout
+
+    def create_request(self):
+        request = AsyncPGoApiRequest(self, self._position_lat, self._position_lng, self._position_alt)
+        return request
+
+    def enable_auth_refresh(self, refresher = None):
+        refresher = refresher or get_default_refresher()
+        refresher.register(self, asyncio.get_event_loop())
+        return refresher
+
+    async def refresh_auth(self, token_margin = 600, ticket_margin = 300):
+        token_due, ticket_due = self.get_refresh_due(token_margin, ticket_margin)
+        token_refreshed = token_due and await asyncio.get_event_loop().run_in_executor(None, self._refresh_token)
+        if not (token_refreshed or ticket_due):
+            return False
+
+        self._auth_provider.clear_ticket()
+        if not await self.create_request().get_player().call():
+            return False
+
+        self._save_token()
+        return True
+
+    def enable_coalescing(self, window = 0.05, max_batch = 5):
+        # sub-requests passed to submit() within window seconds are sent in one envelope
+        previous, self._dispatcher = self._dispatcher, AsyncCoalescingDispatcher(self, window, max_batch)
+        if previous is not None:
+            previous.close()
+        return self._dispatcher
+
+    def submit(self, func, **kwargs):
+        # asyncio.Future of the response of one sub-request, e.g. await api.submit('get_player')
+        if self._dispatcher is None:
+            self._dispatcher = AsyncCoalescingDispatcher(self)
+        return self._dispatcher.submit(func, **kwargs)
+
+    async def login(self, provider, username, password, lat = None, lng = None, alt = None, app_simulation = True, auth_token=None):
+
+        self._init_login(provider, username, password, lat, lng, alt)
+
+        if auth_token is None:
+            cached = self._load_token(provider, username)
+            if cached and await self._login_cached(cached, app_simulation):
+                return True
+
+            # the auth providers are blocking, logins are rare enough to run them in a thread
+            loop = asyncio.get_event_loop()
+            if not await loop.run_in_executor(None, self._auth_provider.login, username, password):
+                self.log.info('Login process failed')
+                return False
+        else:
+            self._reuse_token(auth_token)
+
+        response = await self._create_login_request(app_simulation).call()
+
+        if not self._finish_login(response, app_simulation):
+            return False
+
+        self._save_token()
+        return True
+
+    async def _login_cached(self, cached, app_simulation):
+        self._reuse_cached_token(cached)
+        try:
+            response = await self._create_login_request(app_simulation).call()
+        except (NotLoggedInException, AuthException):
+            response = None
+
+        return self._finish_cached_login(response, app_simulation)
+
+
+class AsyncPGoApiRequest(PGoApiRequest):
+
+    ENDPOINT_ERRORS = PGoApiRequest.ENDPOINT_ERRORS + (asyncio.TimeoutError, )
+
+    def __init__(self, parent, position_lat, position_lng, position_alt):
+        PGoApiRequest.__init__(self, parent, position_lat, position_lng, position_alt)
+        self._timeout = parent.get_timeout()
+
+    async def call(self, timeout = None, deadline = None):
+        if not self._check_call():
+            return NotLoggedInException()
+
+        raise_status_codes = self._retry_policy.retry_status_codes if self._retry_policy else ()
+        request = AsyncRpcApi(self._auth_provider, self._transport, self._wire_capture, self._typed_responses, raise_status_codes)
+
+        if timeout is None:
+            timeout = self._timeout
+        deadline = self._get_deadline(deadline)
+
+        # all attempts share one request id, so the server can tell a retry of a call it already
+        # processed (e.g. after a timeout) from a new call and does not run it twice
+        request_id = request.get_rpc_id()
+
+        self.log.info('Execution of RPC')
+        response = None
+        attempt = 0
+        rediscovered = False
+        delay = self._reserve()
+        try:
+            while True:
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                attempt += 1
+                try:
+                    endpoint, breaker, started = self._before_send(not rediscovered)
+                    try:
+                        # asyncio.TimeoutError is retried if the policy says so, CancelledError never
+                        remaining = self._get_timeout(deadline)
+                        if remaining is not None and (timeout is None or remaining < timeout):
+                            attempt_timeout = remaining
+                        else:
+                            attempt_timeout = timeout
+                        response = await asyncio.wait_for(request.request(endpoint, self._req_method_list, self.get_position(), request_id), attempt_timeout)
+                    except BaseException as e:
+                        self._after_send(endpoint, breaker, started, None, e)
+                        raise
+                    if self._after_send(endpoint, breaker, started, response):
+                        # re-discovered once per call, a still open circuit of the new api_url fails fast
+                        rediscovered = True
+                        attempt -= 1
+                        delay = self._reserve()
+                        continue
+                except ServerSideRequestThrottlingException:
+                    delay = self._on_throttled(deadline)
+                    if delay is None:
+                        raise
+                    continue
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    delay = self._on_error(e, attempt, deadline)
+                    if delay is None:
+                        raise
+                    continue
+                self._on_success()
+                break
+        except ServerBusyOrOfflineException as e:
+            if self._retry_policy:
+                raise
+            self.log.info('Server seems to be busy or offline - try again!')
+        finally:
+            # cleanup after call execution, also if the call got cancelled
+            self.log.info('Cleanup of request!')
+            self._req_method_list = []
+
+        return response
+
+
+class AsyncCoalescingDispatcher(CoalescingDispatcher):
+
+    """
+    asyncio variant of CoalescingDispatcher - submit() returns an asyncio.Future and the
+    envelopes are sent by a task of the event loop instead of a thread.
+    """
+
+    def __init__(self, api, window = 0.05, max_batch = 5):
+        CoalescingDispatcher.__init__(self, api, window, max_batch)
+
+        self._wakeup = None
+        self._task = None
+
+    def submit(self, func, **kwargs):
+        name = func.upper()
+        if name not in RequestType.keys():
+            raise AttributeError(func)
+        if self._closed:
+            raise RuntimeError('Dispatcher is closed')
+
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        if not self._check(name, kwargs, future):
+            return future
+
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+        self._pending.append((name, kwargs, future, time.time()))
+        self._wakeup.set()
+        return future
+
+    def close(self):
+        # the pending sub-requests are still sent, the task ends afterwards
+        self._closed = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _wait(self, timeout = None):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        while True:
+            while not self._pending and not self._closed:
+                await self._wait()
+            if not self._pending:
+                return
+
+            # the oldest pending sub-request decides how long the batch may still wait
+            flush_at = self._pending[0][3] + self._window
+            while not self._closed and self._count_distinct() < self._max_batch:
+                remaining = flush_at - time.time()
+                if remaining <= 0:
+                    break
+                await self._wait(remaining)
+
+            await self._send(self._take_batch())
+
+    async def _send(self, batch):
+        # callers may have cancelled their futures in the meantime
+        batch = [entry for entry in batch if not entry[2].cancelled()]
+        if not batch:
+            return
+
+        request = self._create_request(batch)
+        try:
+            response = await request.call()
+        except Exception as e:
+            response = e
+        self._resolve(batch, response)
+
+
+class AsyncAccountPool(AccountPool):
+
+    """ AccountPool for AsyncPGoApi accounts, jobs are coroutine functions run on the event loop """
+
+    def __init__(self, api_factory = AsyncPGoApi, **kwargs):
+        AccountPool.__init__(self, api_factory, **kwargs)
+        self._released = None
+
+    def _get_released(self):
+        if self._released is None:
+            self._released = asyncio.Event()
+        return self._released
+
+    async def _login_async(self, account):
+        args = self._get_login_args(account)
+        try:
+            ok = await account.api.login(*args, app_simulation = self._app_simulation, auth_token = account.auth_token)
+            if not ok and account.auth_token is not None:
+                account.auth_token = None
+                ok = await account.api.login(*args, app_simulation = self._app_simulation)
+        except self.LOGIN_ERRORS as e:
+            self.log.warning('Login of %s failed: %s', account.username, repr(e))
+            ok = False
+
+        ok = self._login_done(account, ok)
+        self._get_released().set()
+        return ok
+
+    async def login_all(self):
+        semaphore = asyncio.Semaphore(self._login_workers)
+
+        async def login(account):
+            async with semaphore:
+                return await self._login_async(account)
+
+        await asyncio.gather(*[login(account) for account in self._get_logged_out()])
+        return self._count_ready()
+
+    async def acquire(self, timeout = None):
+        deadline = time.time() + timeout if timeout is not None else None
+        released = self._get_released()
+        while True:
+            with self._cond:
+                account = self._pick()
+            if account is not None:
+                return account
+
+            # cooldowns end without anybody setting the event
+            wait = 1.0
+            if deadline is not None:
+                wait = min(wait, deadline - time.time())
+                if wait <= 0:
+                    return None
+
+            released.clear()
+            try:
+                await asyncio.wait_for(released.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, account, error = None):
+        AccountPool.release(self, account, error)
+        self._get_released().set()
+
+    def _relogin(self, account):
+        asyncio.ensure_future(self._login_async(account))
+
+    async def run(self, job, *args, **kwargs):
+        # awaits job(api, *args, **kwargs) with the next available account
+        account = await self.acquire()
+        error = None
+        try:
+            return await job(account.api, *args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(account, error)
+
+    def submit(self, job, *args, **kwargs):
+        return asyncio.ensure_future(self.run(job, *args, **kwargs))
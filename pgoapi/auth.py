@@ -38,6 +38,7 @@ class Auth:
 
         self._login = False
         self._auth_token = None
+        self._token_expire = None
 
         self._ticket_expire = None
         self._ticket_start = None
@@ -52,8 +53,13 @@ class Auth:
     def get_token(self):
         return self._auth_token
 
-    def set_token(self, auth_token):
+    def set_token(self, auth_token, token_expire = None):
         self._auth_token = auth_token
+        self._token_expire = token_expire
+
+    def get_token_expire(self):
+        # ms timestamp of the token expiry, None if unknown
+        return self._token_expire
 
     def has_ticket(self):
         if self._ticket_expire and self._ticket_start and self._ticket_end:
@@ -64,6 +70,12 @@ class Auth:
     def set_ticket(self, params):
         self._ticket_expire, self._ticket_start, self._ticket_end = params
 
+    def clear_ticket(self):
+        self._ticket_expire, self._ticket_start, self._ticket_end = (None, None, None)
+
+    def get_ticket_expire(self):
+        return self._ticket_expire
+
     def is_new_ticket(self, new_ticket_time_ms):
         if self._ticket_expire is None or new_ticket_time_ms > self._ticket_expire:
             return True
@@ -79,7 +91,7 @@ class Auth:
                 return True
             else:
                 self.log.debug('Removed expired auth ticket (%s < %s)', now_ms, self._ticket_expire)
-                self._ticket_expire, self._ticket_start, self._ticket_end = (None, None, None)
+                self.clear_ticket()
                 return False
         else:
             return False
@@ -37,18 +37,45 @@ class AuthGoogle(Auth):
     GOOGLE_LOGIN_APP = 'com.nianticlabs.pokemongo'
     GOOGLE_LOGIN_CLIENT_SIG = '321187995bc7cdc2b5fc91b11a96e2baa8602c62'
 
-    def __init__(self):
+    def __init__(self, master_token_store = None):
         Auth.__init__(self)
 
         self._auth_provider = 'google'
+        # keeps the master token per account, so later logins only need the oauth step (None = no caching),
+        # e.g. TokenStore(path, master_tokens=True)
+        self._master_token_store = master_token_store
 
     def login(self, username, password):
         self.log.info('Google login for: {}'.format(username))
+
+        master_token = self._master_token_store.get_master_token(username) if self._master_token_store else None
+        if master_token:
+            if self._oauth(username, master_token):
+                return True
+            self.log.info('Cached Google master token rejected, full login required')
+            self._master_token_store.remove_master_token(username)
+
         login = perform_master_login(username, password, self.GOOGLE_LOGIN_ANDROID_ID)
-        login = perform_oauth(username, login.get('Token', ''), self.GOOGLE_LOGIN_ANDROID_ID, self.GOOGLE_LOGIN_SERVICE, self.GOOGLE_LOGIN_APP,
+        master_token = login.get('Token')
+        if master_token is None:
+            self.log.info('Google Login failed.')
+            return False
+
+        if not self._oauth(username, master_token):
+            return False
+
+        if self._master_token_store:
+            self._master_token_store.put_master_token(username, master_token)
+
+        return True
+
+    def _oauth(self, username, master_token):
+        login = perform_oauth(username, master_token, self.GOOGLE_LOGIN_ANDROID_ID, self.GOOGLE_LOGIN_SERVICE, self.GOOGLE_LOGIN_APP,
             self.GOOGLE_LOGIN_CLIENT_SIG)
 
         self._auth_token = login.get('Auth')
+        # Expiry: unix timestamp in seconds
+        self._token_expire = int(login['Expiry']) * 1000 if login.get('Expiry') else None
 
         if self._auth_token is None:
             self.log.info('Google Login failed.')
@@ -59,4 +86,4 @@ class AuthGoogle(Auth):
         self.log.info('Google Login successful.')
         self.log.debug('Google Session Token: %s', self._auth_token[:25])
 
-        return True
\ No newline at end of file
+        return True
@@ -31,6 +31,7 @@ import logging
 import requests
 
 from pgoapi.auth import Auth
+from pgoapi.utilities import get_time_ms
 
 class AuthPtc(Auth):
 
@@ -91,11 +92,13 @@ class AuthPtc(Auth):
         r2 = self._session.post(self.PTC_LOGIN_OAUTH, data=data1)
         access_token = re.sub('&expires.*', '', r2.content.decode('utf-8'))
         access_token = re.sub('.*access_token=', '', access_token)
+        expires = re.search('expires=([0-9]+)', r2.content.decode('utf-8'))
 
         if '-sso.pokemon.com' in access_token:
             self.log.info('PTC Login successful')
             self.log.debug('PTC Session Token: %s', access_token[:25])
             self._auth_token = access_token
+            self._token_expire = get_time_ms() + int(expires.group(1)) * 1000 if expires else None
         else:
             self.log.info('Seems not to be a PTC Session Token... login failed :(')
             return False
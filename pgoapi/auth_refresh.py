@@ -0,0 +1,188 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import random
+import logging
+import weakref
+import threading
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+class AuthRefresher:
+
+    """
+    Background thread renewing the OAuth tokens and auth tickets of the registered PGoApi instances
+    ahead of expiry: a token expiring within token_margin seconds is renewed with a new login, a ticket
+    expiring within ticket_margin seconds is replaced by one issued for a token based call. Every api
+    gets a random extra margin of up to spread seconds, so accounts logged in together do not all
+    refresh at the same time.
+    """
+
+    def __init__(self, token_margin = 600, ticket_margin = 300, spread = 120, interval = 10, workers = 4, retry_delay = 60):
+        self.log = logging.getLogger(__name__)
+
+        self._token_margin = token_margin
+        self._ticket_margin = ticket_margin
+        self._spread = spread
+        self._interval = interval
+        self._workers = workers
+        self._retry_delay = retry_delay
+
+        self._lock = threading.Lock()
+        # id(api) -> (weak reference, event loop of an asyncio api, extra margin)
+        self._apis = {}
+        self._refreshing = set()
+        # id(api) -> time of the next attempt after a failed refresh
+        self._retry_at = {}
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+        self.refreshed = 0
+        self.failed = 0
+
+    def register(self, api, loop = None):
+        with self._lock:
+            self._apis[id(api)] = (weakref.ref(api), loop, random.uniform(0, self._spread))
+        self.start()
+
+    def unregister(self, api):
+        self._unregister_key(id(api))
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            if ThreadPoolExecutor is not None:
+                self._executor = ThreadPoolExecutor(self._workers)
+            self._thread = threading.Thread(target=self._run, name='pgoapi-auth-refresh')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            executor, self._executor = self._executor, None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+        if executor is not None:
+            executor.shutdown()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.log.exception('Auth refresh check failed: %s', repr(e))
+
+    def check(self):
+        # one pass over all apis, hands the due ones to the worker threads
+        with self._lock:
+            entries = list(self._apis.items())
+
+        for key, (ref, loop, extra) in entries:
+            api = ref()
+            if api is None:
+                self._unregister_key(key)
+                continue
+            if key in self._refreshing or self._retry_at.get(key, 0) > time.time():
+                continue
+
+            token_margin, ticket_margin = self._token_margin + extra, self._ticket_margin + extra
+            if any(api.get_refresh_due(token_margin, ticket_margin)):
+                with self._lock:
+                    if self._thread is None:
+                        return
+                    self._refreshing.add(key)
+                    self._submit(self._refresh, key, api, loop, token_margin, ticket_margin)
+
+    def _submit(self, func, *args):
+        if self._executor is not None:
+            self._executor.submit(func, *args)
+            return
+
+        # Python 2 without the futures backport: one thread per refresh, still at most one per api
+        thread = threading.Thread(target=func, args=args, name='pgoapi-auth-refresh-worker')
+        thread.daemon = True
+        thread.start()
+
+    def _unregister_key(self, key):
+        with self._lock:
+            self._apis.pop(key, None)
+            self._retry_at.pop(key, None)
+
+    def _refresh(self, key, api, loop, token_margin, ticket_margin):
+        try:
+            if loop is not None:
+                # AsyncPGoApi.refresh_auth is a coroutine, it runs on the loop of the api
+                ok = asyncio.run_coroutine_threadsafe(api.refresh_auth(token_margin, ticket_margin), loop).result()
+            else:
+                ok = api.refresh_auth(token_margin, ticket_margin)
+        except Exception as e:
+            self.log.warning('Auth refresh failed: %s', repr(e))
+            ok = False
+        finally:
+            self._refreshing.discard(key)
+
+        if ok:
+            self.refreshed += 1
+            self._retry_at.pop(key, None)
+        else:
+            self.failed += 1
+            self._retry_at[key] = time.time() + self._retry_delay
+
+
+_default_refresher = None
+_default_refresher_lock = threading.Lock()
+
+
+def get_default_refresher():
+    global _default_refresher
+    if _default_refresher is None:
+        with _default_refresher_lock:
+            if _default_refresher is None:
+                _default_refresher = AuthRefresher()
+    return _default_refresher
+
+
+def set_default_refresher(refresher):
+    global _default_refresher
+    with _default_refresher_lock:
+        _default_refresher = refresher
@@ -0,0 +1,159 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from collections import OrderedDict
+
+from s2sphere import Angle, Cap, Cell, CellId, LatLng
+
+EARTH_RADIUS_M = 6371010.0
+# GET_MAP_OBJECTS works on level 15 cells (~300m)
+DEFAULT_LEVEL = 15
+DEFAULT_RADIUS = 500
+LEAF_LEVEL = 30
+
+
+class CellCover:
+
+    """
+    S2 cell ids of one level covering a disk of radius metres around a position. Covers are memoized
+    per memo_level cell of the position (default: the leaf cell), so standing still or revisiting a
+    position costs a dict lookup. A coarser memo_level trades precision for more hits, the cover is
+    then computed for the center of that cell.
+    """
+
+    def __init__(self, level = DEFAULT_LEVEL, radius = DEFAULT_RADIUS, memo_size = 4096, memo_level = LEAF_LEVEL):
+        self.log = logging.getLogger(__name__)
+
+        self._level = level
+        self._angle = Angle.from_radians(radius / EARTH_RADIUS_M)
+        self._memo_size = memo_size
+        self._memo_level = memo_level
+
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _get_key(self, lat, lng):
+        cell_id = CellId.from_lat_lng(LatLng.from_degrees(lat, lng))
+        if self._memo_level < LEAF_LEVEL:
+            cell_id = cell_id.parent(self._memo_level)
+        return cell_id.id()
+
+    def _lookup(self, key):
+        with self._lock:
+            cell_ids = self._memo.get(key)
+            if cell_ids is None:
+                self.misses += 1
+                return None
+            self._memo[key] = self._memo.pop(key)
+            self.hits += 1
+            return cell_ids
+
+    def _store(self, key, cell_ids):
+        with self._lock:
+            self._memo[key] = cell_ids
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last = False)
+
+    def _cover(self, key, cells, neighbors):
+        # flood fill from the cell of the position over all neighbours the disk touches
+        center = CellId(key).to_point()
+        cap = Cap.from_axis_angle(center, self._angle)
+        origin = CellId.from_point(center).parent(self._level).id()
+
+        seen = set([origin])
+        todo = [origin]
+        cell_ids = []
+        while todo:
+            cell_id = todo.pop()
+            cell = cells.get(cell_id)
+            if cell is None:
+                cell = cells[cell_id] = Cell(CellId(cell_id))
+            if not cap.may_intersect(cell):
+                continue
+            cell_ids.append(cell_id)
+
+            # plain ids are cached, s2sphere's Cell() modifies the CellId it is given
+            cell_neighbors = neighbors.get(cell_id)
+            if cell_neighbors is None:
+                cell_neighbors = neighbors[cell_id] = [n.id() for n in CellId(cell_id).get_all_neighbors(self._level)]
+            for neighbor in cell_neighbors:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    todo.append(neighbor)
+
+        return sorted(cell_ids)
+
+    def get_cell_ids(self, lat, lng):
+        key = self._get_key(lat, lng)
+        cell_ids = self._lookup(key)
+        if cell_ids is None:
+            cell_ids = self._cover(key, {}, {})
+            self._store(key, cell_ids)
+        return list(cell_ids)
+
+    def get_cell_ids_batch(self, positions):
+        # covers for many (lat, lng) positions, the cell geometry is shared between neighbouring positions
+        cells = {}
+        neighbors = {}
+        covers = {}
+
+        result = []
+        for lat, lng in positions:
+            key = self._get_key(lat, lng)
+            cell_ids = covers.get(key) or self._lookup(key)
+            if cell_ids is None:
+                cell_ids = self._cover(key, cells, neighbors)
+                self._store(key, cell_ids)
+            covers[key] = cell_ids
+            result.append(list(cell_ids))
+        return result
+
+    def get_metrics(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._memo)}
+
+
+_covers = {}
+_covers_lock = threading.Lock()
+
+
+def get_cell_cover(radius = DEFAULT_RADIUS, level = DEFAULT_LEVEL):
+    # shared memoized cover per radius and level
+    with _covers_lock:
+        cover = _covers.get((radius, level))
+        if cover is None:
+            cover = _covers[(radius, level)] = CellCover(level, radius)
+        return cover
+
+
+def get_cell_ids(lat, lng, radius = DEFAULT_RADIUS):
+    return get_cell_cover(radius).get_cell_ids(lat, lng)
@@ -0,0 +1,173 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+from collections import deque
+
+from pgoapi.exceptions import CircuitOpenException
+
+log = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+
+    """
+    Tracks the last window calls to one endpoint. Opens if at least min_calls of them were made and
+    the share of failed ones (errors or slower than slow_call seconds) reaches failure_rate: calls then
+    fail fast with CircuitOpenException. After open_timeout seconds up to half_open_probes calls are
+    let through, a successful probe closes the circuit again, a failed one reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name = None, failure_rate = 0.5, min_calls = 10, window = 20, slow_call = 10.0,
+                 open_timeout = 30.0, half_open_probes = 1, clock = time.time):
+        self.log = logging.getLogger(__name__)
+
+        self._name = name
+        self._failure_rate = failure_rate
+        self._min_calls = min_calls
+        self._slow_call = slow_call
+        self._open_timeout = open_timeout
+        self._half_open_probes = half_open_probes
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0
+        self._probes = 0
+
+        # (failed, latency) of the last calls
+        self._results = deque(maxlen=window)
+        self.rejected = 0
+
+    def get_state(self):
+        with self._lock:
+            self._check_timeout()
+            return self._state
+
+    def _check_timeout(self):
+        if self._state == self.OPEN and self._clock() >= self._opened_at + self._open_timeout:
+            self.log.info('Circuit of %s half-open - probing', self._name)
+            self._state = self.HALF_OPEN
+            self._probes = 0
+
+    def allow(self):
+        with self._lock:
+            self._check_timeout()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes < self._half_open_probes:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def start(self):
+        # start time of a call, CircuitOpenException if the circuit does not let it through
+        if not self.allow():
+            raise CircuitOpenException('Circuit of {} is open'.format(self._name))
+        return self._clock()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self.log.warning('Circuit of %s opened (error rate %.0f%%)', self._name, self._get_error_rate() * 100)
+
+    def _get_error_rate(self):
+        if not self._results:
+            return 0.0
+        return sum(1 for failed, latency in self._results if failed) / float(len(self._results))
+
+    def _record(self, failed, started):
+        latency = self._clock() - started
+        failed = failed or (self._slow_call is not None and latency > self._slow_call)
+
+        with self._lock:
+            self._results.append((failed, latency))
+
+            if self._state == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if failed:
+                    self._open()
+                else:
+                    self.log.info('Circuit of %s closed', self._name)
+                    self._state = self.CLOSED
+                    self._results.clear()
+            elif self._state == self.CLOSED and failed and len(self._results) >= self._min_calls \
+                    and self._get_error_rate() >= self._failure_rate:
+                self._open()
+
+    def on_success(self, started):
+        self._record(False, started)
+
+    def on_failure(self, started):
+        self._record(True, started)
+
+    def release(self):
+        # a call which ended without telling anything about the endpoint (e.g. invalid arguments)
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def get_metrics(self):
+        with self._lock:
+            self._check_timeout()
+            latencies = [latency for failed, latency in self._results]
+            return {'state': self._state,
+                    'error_rate': self._get_error_rate(),
+                    'latency': sum(latencies) / len(latencies) if latencies else 0.0,
+                    'calls': len(self._results),
+                    'rejected': self.rejected}
+
+
+class EndpointHealth:
+
+    """ One CircuitBreaker per endpoint, share one instance between all PGoApi instances of a process """
+
+    def __init__(self, **breaker_args):
+        self._breaker_args = breaker_args
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def get_breaker(self, endpoint):
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(endpoint)
+                if breaker is None:
+                    breaker = self._breakers[endpoint] = CircuitBreaker(endpoint, **self._breaker_args)
+        return breaker
+
+    def get_metrics(self):
+        # endpoint -> {'state', 'error_rate', 'latency' (avg. seconds), 'calls', 'rejected'}
+        return dict((endpoint, breaker.get_metrics()) for endpoint, breaker in list(self._breakers.items()))
@@ -0,0 +1,185 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+try:
+    from concurrent.futures import Future
+except ImportError:
+    Future = None
+
+from pgoapi.registry import get_request_builder, get_response_class
+from pgoapi.exceptions import ServerBusyOrOfflineException, PleaseInstallFutures, UnknownRequestTypeException, \
+    InvalidRequestArgumentException
+
+from . import protos
+from POGOProtos.Networking.Requests_pb2 import RequestType
+
+
+class CoalescingDispatcher:
+
+    """
+    Collects the sub-requests submitted for one account within window seconds (or until max_batch
+    of them are pending) and sends them as one RequestEnvelope. Every caller gets a Future resolving
+    to the response of its own sub-request. A batch never holds two sub-requests of the same type,
+    as their responses could not be told apart - those wait for the next envelope.
+    """
+
+    def __init__(self, api, window = 0.05, max_batch = 5):
+        self.log = logging.getLogger(__name__)
+
+        # concurrent.futures is part of Python 3, Python 2 needs the futures backport
+        if Future is None:
+            raise PleaseInstallFutures()
+
+        self._api = api
+        self._window = window
+        self._max_batch = max_batch
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._closed = False
+        self._thread = None
+
+        self.envelopes = 0
+        self.subrequests = 0
+
+    def submit(self, func, **kwargs):
+        name = func.upper()
+        if name not in RequestType.keys():
+            raise AttributeError(func)
+
+        future = Future()
+        if not self._check(name, kwargs, future):
+            return future
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Dispatcher is closed')
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pgoapi-coalesce')
+                self._thread.daemon = True
+                self._thread.start()
+
+            self._pending.append((name, kwargs, future, time.time()))
+            self._cond.notify()
+        return future
+
+    def _check(self, name, kwargs, future):
+        # the sub-request is built once up front, so bad arguments only fail the future of their caller
+        # instead of the whole envelope
+        try:
+            request_type = RequestType.Value(name)
+            get_response_class(request_type)
+            if kwargs:
+                get_request_builder(request_type)(kwargs)
+        except (UnknownRequestTypeException, InvalidRequestArgumentException) as e:
+            future.set_exception(e)
+            return False
+        return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _count_distinct(self):
+        return len(set(name for name, kwargs, future, submitted in self._pending))
+
+    def _take_batch(self):
+        batch, names, rest = [], set(), []
+        for entry in self._pending:
+            if entry[0] in names or len(batch) >= self._max_batch:
+                rest.append(entry)
+            else:
+                names.add(entry[0])
+                batch.append(entry)
+        self._pending = rest
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+
+                # the oldest pending sub-request decides how long the batch may still wait
+                flush_at = self._pending[0][3] + self._window
+                while not self._closed and self._count_distinct() < self._max_batch:
+                    remaining = flush_at - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._take_batch()
+
+            self._send(batch)
+
+    def _send(self, batch):
+        # callers may have cancelled their futures in the meantime
+        batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        request = self._create_request(batch)
+        try:
+            response = request.call()
+        except Exception as e:
+            response = e
+        self._resolve(batch, response)
+
+    def _create_request(self, batch):
+        request = self._api.create_request()
+        for name, kwargs, future, submitted in batch:
+            getattr(request, name.lower())(**kwargs)
+
+        self.envelopes += 1
+        self.subrequests += len(batch)
+        self.log.debug('Sending %s coalesced sub-requests in one envelope', len(batch))
+        return request
+
+    def _resolve(self, batch, response):
+        if isinstance(response, Exception):
+            error = response
+        elif not response:
+            error = ServerBusyOrOfflineException()
+        else:
+            error = None
+
+        for name, kwargs, future, submitted in batch:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(response.get('responses', {}).get(name))
@@ -42,4 +42,28 @@ class EmptySubrequestChainException(Exception):
     pass
     
 class ServerSideRequestThrottlingException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class UnknownRequestTypeException(Exception):
+    pass
+
+class InvalidRequestArgumentException(Exception):
+    pass
+
+class PleaseInstallAiohttp(Exception):
+    pass
+
+class PleaseInstallNumpy(Exception):
+    pass
+
+class PleaseInstallFutures(Exception):
+    pass
+
+class HttpStatusException(Exception):
+
+    def __init__(self, status_code):
+        Exception.__init__(self, 'Unexpected HTTP server response - needs 200 got {}'.format(status_code))
+        self.status_code = status_code
+
+class CircuitOpenException(Exception):
+    pass
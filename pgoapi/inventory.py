@@ -0,0 +1,112 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+
+# one entry per item id, candy family and pokedex entry, everything else is a single entry per player
+KEY_FIELDS = {
+    'item': 'item_id',
+    'candy': 'family_id',
+    'pokedex_entry': 'pokemon_id',
+}
+
+
+def get_inventory_key(data):
+    # key of an inventory_item_data dict, pokemon and eggs use their id like deleted_item_key does
+    if 'pokemon_data' in data:
+        return data['pokemon_data'].get('id')
+
+    for field, key_field in KEY_FIELDS.items():
+        if field in data:
+            return (field, data[field].get(key_field))
+    return next(iter(data), None)
+
+
+class InventoryState:
+
+    """
+    Local snapshot of the inventory of one player. The GET_INVENTORY requests pass get_timestamp() as
+    last_timestamp_ms, apply() then merges the returned inventory_delta into the snapshot.
+    """
+
+    def __init__(self):
+        self.log = logging.getLogger(__name__)
+
+        self._timestamp_ms = 0
+        self._items = {}
+
+    def get_timestamp(self):
+        return self._timestamp_ms
+
+    def get(self, key, default = None):
+        return self._items.get(key, default)
+
+    def values(self):
+        return list(self._items.values())
+
+    def __len__(self):
+        return len(self._items)
+
+    def reset(self):
+        self._timestamp_ms = 0
+        self._items = {}
+
+    def apply(self, inventory_delta):
+        # list of (key, old data, new data) for all entries that changed, data is None for added/removed ones
+        changes = []
+        full = not self._timestamp_ms or not inventory_delta.get('original_timestamp_ms')
+
+        seen = set()
+        for inventory_item in inventory_delta.get('inventory_items', []):
+            deleted_key = inventory_item.get('deleted_item_key')
+            if deleted_key:
+                if deleted_key in self._items:
+                    changes.append((deleted_key, self._items.pop(deleted_key), None))
+                continue
+
+            data = inventory_item.get('inventory_item_data')
+            if not data:
+                continue
+            key = get_inventory_key(data)
+            seen.add(key)
+
+            old = self._items.get(key)
+            if old != data:
+                self._items[key] = data
+                changes.append((key, old, data))
+
+        # a full inventory replaces the snapshot, whatever it does not contain is gone
+        if full:
+            for key in [key for key in self._items if key not in seen]:
+                changes.append((key, self._items.pop(key), None))
+
+        new_timestamp_ms = inventory_delta.get('new_timestamp_ms')
+        if new_timestamp_ms:
+            self._timestamp_ms = max(self._timestamp_ms, new_timestamp_ms)
+
+        self.log.debug('Inventory delta applied: %s changes, %s entries', len(changes), len(self._items))
+        return changes
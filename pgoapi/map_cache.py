@@ -0,0 +1,142 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from collections import OrderedDict
+
+from pgoapi.utilities import get_time_ms
+
+
+class MapCellCache:
+
+    """
+    Map objects per S2 cell. The GET_MAP_OBJECTS requests pass get_since_timestamps(cell_ids) as
+    since_timestamp_ms, apply() merges the returned cells into the cache, so overlapping scans only
+    transfer what changed since the last response for a cell.
+    """
+
+    def __init__(self, max_cells = 10000):
+        self.log = logging.getLogger(__name__)
+
+        self._max_cells = max_cells
+        self._cells = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cells)
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+
+    def get_since_timestamps(self, cell_ids):
+        with self._lock:
+            return [self._cells[cell_id]['current_timestamp_ms'] if cell_id in self._cells else 0 for cell_id in cell_ids]
+
+    def apply(self, get_map_objects):
+        # merges the map cells of a GET_MAP_OBJECTS response, returns them with the cached forts, spawn points and wild pokemon
+        if get_map_objects.get('status') != 1:
+            return []
+
+        now_ms = get_time_ms()
+        with self._lock:
+            return [self._merge(map_cell, now_ms) for map_cell in get_map_objects.get('map_cells', [])]
+
+    def _get_cell(self, cell_id):
+        cell = self._cells.pop(cell_id, None)
+        if cell is None:
+            cell = {'current_timestamp_ms': 0, 'forts': {}, 'spawn_points': {}, 'wild_pokemons': {}}
+        self._cells[cell_id] = cell
+        while len(self._cells) > self._max_cells:
+            self._cells.popitem(last = False)
+        return cell
+
+    def _merge(self, map_cell, now_ms):
+        cell_id = map_cell['s2_cell_id']
+        cell = self._get_cell(cell_id)
+
+        for fort_id in map_cell.get('deleted_objects', []):
+            cell['forts'].pop(fort_id, None)
+        for fort in map_cell.get('forts', []):
+            cell['forts'][fort['id']] = fort
+
+        for spawn_point in map_cell.get('spawn_points', []):
+            cell['spawn_points'][(spawn_point.get('latitude'), spawn_point.get('longitude'))] = spawn_point
+
+        for wild_pokemon in map_cell.get('wild_pokemons', []):
+            wild_pokemon['hides_at_ms'] = now_ms + wild_pokemon.get('time_till_hidden_ms', 0)
+            cell['wild_pokemons'][wild_pokemon['encounter_id']] = wild_pokemon
+        for encounter_id, wild_pokemon in list(cell['wild_pokemons'].items()):
+            if wild_pokemon['hides_at_ms'] <= now_ms:
+                del cell['wild_pokemons'][encounter_id]
+
+        # a truncated cell is requested in full again
+        if not map_cell.get('is_truncated_list'):
+            cell['current_timestamp_ms'] = map_cell.get('current_timestamp_ms', 0)
+
+        merged = dict(map_cell)
+        merged.update(self._to_map_cell(cell_id, cell))
+        return merged
+
+    def _to_map_cell(self, cell_id, cell):
+        return {'s2_cell_id': cell_id, 'current_timestamp_ms': cell['current_timestamp_ms'],
+                'forts': list(cell['forts'].values()),
+                'spawn_points': list(cell['spawn_points'].values()),
+                'wild_pokemons': list(cell['wild_pokemons'].values())}
+
+    def restore(self, cell_id, current_timestamp_ms, forts = (), spawn_points = (), wild_pokemons = ()):
+        # puts back a cell saved earlier, e.g. by pgoapi.world_store, wild pokemon need their hides_at_ms
+        with self._lock:
+            cell = self._get_cell(cell_id)
+            cell['current_timestamp_ms'] = current_timestamp_ms
+            for fort in forts:
+                cell['forts'][fort['id']] = fort
+            for spawn_point in spawn_points:
+                cell['spawn_points'][(spawn_point.get('latitude'), spawn_point.get('longitude'))] = spawn_point
+            for wild_pokemon in wild_pokemons:
+                cell['wild_pokemons'][wild_pokemon['encounter_id']] = wild_pokemon
+
+    def get_cells(self):
+        # all cached cells in the shape of GET_MAP_OBJECTS map cells
+        with self._lock:
+            return [self._to_map_cell(cell_id, cell) for cell_id, cell in self._cells.items()]
+
+    def get_forts(self):
+        with self._lock:
+            return [fort for cell in self._cells.values() for fort in cell['forts'].values()]
+
+    def get_spawn_points(self):
+        with self._lock:
+            return [spawn_point for cell in self._cells.values() for spawn_point in cell['spawn_points'].values()]
+
+    def get_wild_pokemons(self):
+        now_ms = get_time_ms()
+        with self._lock:
+            return [wild_pokemon for cell in self._cells.values() for wild_pokemon in cell['wild_pokemons'].values()
+                    if wild_pokemon['hides_at_ms'] > now_ms]
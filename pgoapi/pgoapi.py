@@ -27,14 +27,22 @@ from __future__ import absolute_import
 
 import re
 import six
+import time
 import logging
+import threading
 import requests
 
 from . import __title__, __version__, __copyright__
 from pgoapi.rpc_api import RpcApi
 from pgoapi.auth_ptc import AuthPtc
 from pgoapi.auth_google import AuthGoogle
-from pgoapi.exceptions import AuthException, NotLoggedInException, ServerBusyOrOfflineException, NoPlayerPositionSetException, EmptySubrequestChainException
+from pgoapi.transport import HttpTransport, get_default_transport
+from pgoapi.wire_capture import WireCapture
+from pgoapi.coalesce import CoalescingDispatcher
+from pgoapi.auth_refresh import get_default_refresher
+from pgoapi.token_store import get_default_token_store
+from pgoapi.utilities import get_time_ms
+from pgoapi.exceptions import AuthException, NotLoggedInException, ServerBusyOrOfflineException, NoPlayerPositionSetException, EmptySubrequestChainException, ServerSideRequestThrottlingException, HttpStatusException, CircuitOpenException
 
 from . import protos
 from POGOProtos.Networking.Requests_pb2 import RequestType
@@ -43,12 +51,37 @@ logger = logging.getLogger(__name__)
 
 class PGoApi:
 
-    def __init__(self):
+    API_ENTRY = 'https://pgorelease.nianticlabs.com/plfe/rpc'
+
+    def __init__(self, transport = None, pool_size = None, typed_responses = False, rate_limiter = None, throttle = None, retry_policy = None, endpoint_health = None, token_store = None):
 
         self.set_logger()
 
         self._auth_provider = None
-        self._api_endpoint = 'https://pgorelease.nianticlabs.com/plfe/rpc'
+        self._api_entry = self.API_ENTRY
+        self._api_endpoint = self.API_ENTRY
+
+        # all instances share one pooled transport unless an own one is requested
+        if transport is None and pool_size is not None:
+            transport = HttpTransport(pool_size = pool_size)
+        self._transport = transport or get_default_transport()
+        self._wire_capture = None
+        self._typed_responses = typed_responses
+
+        # pgoapi.rate_limit.RateLimiter, spaces the calls of this account (None = no limit)
+        self._rate_limiter = rate_limiter
+        # pgoapi.throttle.ThrottleController, adapts the rate per endpoint to status code 52 responses
+        self._throttle = throttle
+        # pgoapi.retry.RetryPolicy, retries failed calls (None = no retries, busy servers return None)
+        self._retry_policy = retry_policy
+        # pgoapi.circuit_breaker.EndpointHealth, fails calls fast while the circuit of an endpoint is open
+        self._endpoint_health = endpoint_health
+        # pgoapi.token_store.TokenStore, caches tokens and tickets across runs
+        # (None = the store set by set_default_token_store(), if any, False = no caching)
+        self._token_store = get_default_token_store() if token_store is None else token_store
+        self._dispatcher = None
+        self._dispatcher_lock = threading.Lock()
+        self._credentials = None
 
         self._position_lat = None
         self._position_lng = None
@@ -62,6 +95,70 @@ class PGoApi:
     def get_api_endpoint(self):
         return self._api_endpoint
 
+    def set_api_endpoint(self, api_endpoint):
+        # the entry endpoint, logins and re-discovery of the api_url go there
+        self._api_entry = api_endpoint
+        self._api_endpoint = api_endpoint
+
+    def get_api_entry(self):
+        return self._api_entry
+
+    def _set_api_url(self, api_url):
+        # keep the scheme of the entry endpoint (plain http for a local stand-in server)
+        scheme = self._api_entry.split('://', 1)[0]
+        self._api_endpoint = ('{}://{}/rpc'.format(scheme, api_url))
+        self.log.debug('Setting API endpoint to: %s', self._api_endpoint)
+
+    def get_transport(self):
+        return self._transport
+
+    def get_wire_capture(self):
+        return self._wire_capture
+
+    def get_rate_limiter(self):
+        return self._rate_limiter
+
+    def set_rate_limiter(self, rate_limiter):
+        self._rate_limiter = rate_limiter
+
+    def get_throttle(self):
+        return self._throttle
+
+    def set_throttle(self, throttle):
+        self._throttle = throttle
+
+    def get_retry_policy(self):
+        return self._retry_policy
+
+    def set_retry_policy(self, retry_policy):
+        self._retry_policy = retry_policy
+
+    def get_endpoint_health(self):
+        return self._endpoint_health
+
+    def set_endpoint_health(self, endpoint_health):
+        # pgoapi.circuit_breaker.EndpointHealth, fails calls fast while the circuit of an endpoint is open
+        self._endpoint_health = endpoint_health
+
+    def get_token_store(self):
+        return self._token_store
+
+    def set_token_store(self, token_store):
+        self._token_store = token_store
+
+    def get_typed_responses(self):
+        return self._typed_responses
+
+    def set_typed_responses(self, typed_responses):
+        # True: sub-responses are ProtoObject instances (attribute access) instead of dicts
+        self._typed_responses = typed_responses
+
+    def set_wire_capture(self, capture):
+        # raw envelopes are written to the capture file, decode them with: python -m pgoapi.wire_capture <file>
+        if capture is not None and not isinstance(capture, WireCapture):
+            capture = WireCapture(capture)
+        self._wire_capture = capture
+
     def get_position(self):
         return (self._position_lat, self._position_lng, self._position_alt)
 
@@ -73,9 +170,33 @@ class PGoApi:
         self._position_alt = alt
         
     def create_request(self):    
-        request = PGoApiRequest(self._api_endpoint, self._auth_provider, self._position_lat, self._position_lng, self._position_alt)
+        request = PGoApiRequest(self, self._position_lat, self._position_lng, self._position_alt)
         return request
 
+    def enable_coalescing(self, window = 0.05, max_batch = 5):
+        # sub-requests passed to submit() within window seconds are sent in one envelope
+        dispatcher = CoalescingDispatcher(self, window, max_batch)
+        with self._dispatcher_lock:
+            previous, self._dispatcher = self._dispatcher, dispatcher
+        if previous is not None:
+            previous.close()
+        return dispatcher
+
+    def disable_coalescing(self):
+        with self._dispatcher_lock:
+            dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is not None:
+            dispatcher.close()
+
+    def submit(self, func, **kwargs):
+        # concurrent.futures.Future of the response of one sub-request, e.g. api.submit('get_player').result()
+        with self._dispatcher_lock:
+            # threads submitting at the same time share the dispatcher created by the first of them
+            if self._dispatcher is None:
+                self._dispatcher = CoalescingDispatcher(self)
+            dispatcher = self._dispatcher
+        return dispatcher.submit(func, **kwargs)
+
     def __getattr__(self, func):
     
         def function(**kwargs):
@@ -90,6 +211,55 @@ class PGoApi:
         
     def login(self, provider, username, password, lat = None, lng = None, alt = None, app_simulation = True, auth_token=None):
 
+        self._init_login(provider, username, password, lat, lng, alt)
+
+        if auth_token is None:
+            cached = self._load_token(provider, username)
+            if cached and self._login_cached(cached, app_simulation):
+                return True
+
+            if not self._auth_provider.login(username, password):
+                self.log.info('Login process failed')
+                return False
+        else:
+            self._reuse_token(auth_token)
+
+        response = self._create_login_request(app_simulation).call()
+
+        if not self._finish_login(response, app_simulation):
+            return False
+
+        self._save_token()
+        return True
+
+    def _login_cached(self, cached, app_simulation):
+        self._reuse_cached_token(cached)
+        try:
+            response = self._create_login_request(app_simulation).call()
+        except (NotLoggedInException, AuthException):
+            response = None
+
+        return self._finish_cached_login(response, app_simulation)
+
+    def _reuse_cached_token(self, cached):
+        self._reuse_token(cached['token'], cached['token_expire'])
+        if cached['ticket']:
+            self._auth_provider.set_ticket(cached['ticket'])
+
+    def _finish_cached_login(self, response, app_simulation):
+        if self._finish_login(response, app_simulation):
+            self._save_token()
+            return True
+
+        # the server rejected the cached token, log in with the credentials again
+        self.log.info('Cached token rejected, logging in again')
+        provider, username, password = self._credentials
+        self._token_store.remove(provider, username)
+        self._auth_provider = self._create_auth_provider(provider)
+        return False
+
+    def _init_login(self, provider, username, password, lat, lng, alt):
+
         if lat and lng and alt:
             self._position_lat = lat
             self._position_lng = lng
@@ -98,51 +268,116 @@ class PGoApi:
         if not isinstance(username, six.string_types) or not isinstance(password, six.string_types):
             raise AuthException("Username/password not correctly specified")
 
+        self._auth_provider = self._create_auth_provider(provider)
+        # kept to refresh the token in the background
+        self._credentials = (provider, username, password)
+
+        self.log.debug('Auth provider: %s', provider)
+
+    def _create_auth_provider(self, provider):
         if provider == 'ptc':
-            self._auth_provider = AuthPtc()
+            return AuthPtc()
         elif provider == 'google':
-            self._auth_provider = AuthGoogle()
+            return AuthGoogle(master_token_store = self._token_store)
         else:
             raise AuthException("Invalid authentication provider - only ptc/google available.")
 
-        self.log.debug('Auth provider: %s', provider)
+    def enable_auth_refresh(self, refresher = None):
+        # token and auth ticket are renewed ahead of expiry in the background
+        refresher = refresher or get_default_refresher()
+        refresher.register(self)
+        return refresher
 
-        if auth_token is None:
-            if not self._auth_provider.login(username, password):
-                self.log.info('Login process failed')
-                return False
-            with open("token.txt", "w") as f:
-                f.write(self._auth_provider.get_token())
-                self.log.info('Token saved')
-        else:
-            self.log.info('Reuse token')
-            self._auth_provider._login = True
-            self._auth_provider.set_token(auth_token)
+    def get_refresh_due(self, token_margin = 600, ticket_margin = 300):
+        # (token due, ticket due): whether token and auth ticket expire within the margins (seconds)
+        if self._auth_provider is None or not self._auth_provider.is_login():
+            return (False, False)
+
+        now_ms = get_time_ms()
+        token_expire = self._auth_provider.get_token_expire()
+        ticket_expire = self._auth_provider.get_ticket_expire()
+        token_due = token_expire is not None and token_expire - now_ms < token_margin * 1000
+        ticket_due = ticket_expire is not None and ticket_expire - now_ms < ticket_margin * 1000
+        return (token_due, ticket_due)
+
+    def refresh_auth(self, token_margin = 600, ticket_margin = 300):
+        token_due, ticket_due = self.get_refresh_due(token_margin, ticket_margin)
+        token_refreshed = token_due and self._refresh_token()
+        if not (token_refreshed or ticket_due):
+            return False
+
+        # a call authenticated with the token gets a new auth ticket
+        self._auth_provider.clear_ticket()
+        if not self.create_request().get_player().call():
+            return False
+
+        self._save_token()
+        return True
+
+    def _refresh_token(self):
+        provider, username, password = self._credentials or (None, None, None)
+        if not password:
+            self.log.info('No credentials to refresh the token')
+            return False
+
+        auth_provider = self._create_auth_provider(provider)
+        if not auth_provider.login(username, password):
+            self.log.warning('Token refresh for %s failed', username)
+            return False
+
+        self._auth_provider.set_token(auth_provider.get_token(), auth_provider.get_token_expire())
+        self.log.info('Token of %s refreshed', username)
+        return True
+
+    def _load_token(self, provider, username):
+        if not self._token_store:
+            return None
+
+        cached = self._token_store.get(provider, username)
+        if cached:
+            self.log.info('Found cached token for %s', username)
+        return cached
+
+    def _save_token(self):
+        if not self._token_store or self._credentials is None:
+            return
+
+        provider, username, password = self._credentials
+        self._token_store.put(provider, username, self._auth_provider.get_token(),
+                              self._auth_provider.get_token_expire(), self._auth_provider.get_ticket())
+        self.log.info('Token saved')
+
+    def _reuse_token(self, auth_token, token_expire = None):
+        self.log.info('Reuse token')
+        self._auth_provider._login = True
+        self._auth_provider.set_token(auth_token, token_expire)
+
+    def _create_login_request(self, app_simulation):
+        request = self.create_request()
 
         if app_simulation:
             self.log.info('Starting RPC login sequence (app simulation)')
 
             # making a standard call, like it is also done by the client
-            request = self.create_request()
-
             request.get_player()
             request.get_hatched_eggs()
             request.get_inventory()
             request.check_awarded_badges()
             request.download_settings(hash="05daf51635c82611d1aac95c0b051d3ec088a930")
-
-            response = request.call()
         else:
             self.log.info('Starting minimal RPC login sequence')
-            response = self.get_player()
+            request.get_player()
+
+        return request
+
+    def _finish_login(self, response, app_simulation):
 
         if not response:
             self.log.info('Login failed!')
             return False
 
         if 'api_url' in response:
-            self._api_endpoint = ('https://{}/rpc'.format(response['api_url']))
-            self.log.debug('Setting API endpoint to: %s', self._api_endpoint)
+            self._set_api_url(response['api_url'])
         else:
             self.log.error('Login failed - unexpected server response!')
             return False
@@ -158,12 +393,20 @@ class PGoApi:
         
 
 class PGoApiRequest:
-    def __init__(self, api_endpoint, auth_provider, position_lat, position_lng, position_alt):
+    def __init__(self, parent, position_lat, position_lng, position_alt):
         self.log = logging.getLogger(__name__)
 
         """ Inherit necessary parameters """
-        self._api_endpoint = api_endpoint
-        self._auth_provider = auth_provider
+        self._parent = parent
+        self._api_endpoint = parent.get_api_endpoint()
+        self._auth_provider = parent._auth_provider
+        self._transport = parent.get_transport()
+        self._wire_capture = parent.get_wire_capture()
+        self._typed_responses = parent.get_typed_responses()
+        self._rate_limiter = parent.get_rate_limiter()
+        self._throttle = parent.get_throttle()
+        self._retry_policy = parent.get_retry_policy()
+        self._endpoint_health = parent.get_endpoint_health()
 
         self._position_lat = position_lat
         self._position_lng = position_lng
@@ -171,7 +414,7 @@ class PGoApiRequest:
 
         self._req_method_list = []
 
-    def call(self):
+    def _check_call(self):
         if not self._req_method_list:
             raise EmptySubrequestChainException()
             
@@ -180,20 +423,174 @@ class PGoApiRequest:
 
         if self._auth_provider is None or not self._auth_provider.is_login():
             self.log.info('Not logged in')
+            return False
+
+        return True
+
+    def _reserve(self):
+        # seconds to wait for the rate limiter and the throttle of the endpoint
+        delay = 0.0
+        if self._rate_limiter:
+            delay = self._rate_limiter.reserve()
+        if self._throttle:
+            delay = max(delay, self._throttle.reserve(self._api_endpoint))
+        return delay
+
+    def _release(self):
+        # gives back what _reserve() took for a retry which is not sent
+        if self._rate_limiter:
+            self._rate_limiter.release()
+        if self._throttle:
+            self._throttle.release(self._api_endpoint)
+
+    def _on_success(self):
+        if self._throttle:
+            self._throttle.on_success(self._api_endpoint)
+
+    def _on_throttled(self, deadline):
+        # time to wait before retrying a throttled call, None if it does not fit into the deadline
+        if self._throttle:
+            self._throttle.on_throttle(self._api_endpoint)
+        if deadline is None:
+            return None
+
+        delay = self._reserve()
+        if time.time() + delay >= deadline:
+            self._release()
+            return None
+
+        self.log.info('Request throttled by server - retrying in %.2f s', delay)
+        return delay
+
+    def _on_error(self, e, attempt, deadline):
+        # time to wait before retrying a failed call, None if the policy gives up on it
+        policy = self._retry_policy
+        if policy is None or attempt >= policy.max_attempts or not policy.is_retryable(e):
+            return None
+
+        delay = max(policy.get_delay(attempt), self._reserve())
+        if deadline is not None and time.time() + delay >= deadline:
+            self._release()
+            return None
+
+        self.log.info('Request failed (%s) - retry %s/%s in %.2f s', repr(e), attempt, policy.max_attempts - 1, delay)
+        return delay
+
+    def _before_send(self, rediscover = True):
+        # endpoint, circuit breaker and start time of the next attempt
+        if self._endpoint_health is None:
+            return (self._api_endpoint, None, None)
+
+        self._api_endpoint = self._parent.get_api_endpoint()
+        breaker = self._endpoint_health.get_breaker(self._api_endpoint)
+        try:
+            return (self._api_endpoint, breaker, breaker.start())
+        except CircuitOpenException:
+            # while the circuit of the api_url is open, the entry endpoint is asked for a new one
+            api_entry = self._parent.get_api_entry()
+            if api_entry == self._api_endpoint or not rediscover:
+                raise
+
+        breaker = self._endpoint_health.get_breaker(api_entry)
+        started = breaker.start()
+        self.log.info('Circuit of %s is open - re-discovering api_url via %s', self._api_endpoint, api_entry)
+        return (api_entry, breaker, started)
+
+    # errors counting against the health of an endpoint
+    ENDPOINT_ERRORS = (ServerBusyOrOfflineException, HttpStatusException)
+
+    def _after_send(self, endpoint, breaker, started, response, error = None):
+        # True if the call has to be sent again to the re-discovered api_url
+        if breaker is None:
+            return False
+
+        if isinstance(error, self.ENDPOINT_ERRORS) or (error is None and response is False):
+            breaker.on_failure(started)
+        elif error is None or isinstance(error, (ServerSideRequestThrottlingException, NotLoggedInException)):
+            breaker.on_success(started)
+            if error is None and endpoint != self._api_endpoint and response and 'api_url' in response:
+                self._parent._set_api_url(response['api_url'])
+                self._api_endpoint = self._parent.get_api_endpoint()
+                # the entry endpoint answers with status code 53 and the api_url only, no sub-responses
+                return not response.get('responses')
+        else:
+            breaker.release()
+        return False
+
+    def _create_rpc_api(self):
+        raise_status_codes = self._retry_policy.retry_status_codes if self._retry_policy else ()
+        return RpcApi(self._auth_provider, self._transport, self._wire_capture, self._typed_responses, raise_status_codes)
+
+    def _get_deadline(self, deadline):
+        # absolute deadline of a call from the relative one given to call() or the retry policy
+        if deadline is None and self._retry_policy:
+            deadline = self._retry_policy.deadline
+        if deadline is not None:
+            deadline = time.time() + deadline
+        return deadline
+
+    def _get_timeout(self, deadline):
+        # seconds left for the next attempt, the timeout of the transport applies if it is shorter
+        if deadline is None:
+            return None
+        return max(deadline - time.time(), 0.001)
+
+    def call(self, deadline = None):
+        if not self._check_call():
             return NotLoggedInException()
 
-        request = RpcApi(self._auth_provider)
+        request = self._create_rpc_api()
+
+        # deadline: seconds for the call including retries, throttled calls are only retried with one
+        deadline = self._get_deadline(deadline)
+
+        # all attempts share one request id, so the server can tell a retry of a call it already
+        # processed (e.g. after a read timeout) from a new call and does not run it twice
+        request_id = request.get_rpc_id()
 
         self.log.info('Execution of RPC')
         response = None
+        attempt = 0
+        rediscovered = False
+        delay = self._reserve()
         try:
-            response = request.request(self._api_endpoint, self._req_method_list, self.get_position())
+            while True:
+                if delay > 0:
+                    time.sleep(delay)
+                attempt += 1
+                try:
+                    endpoint, breaker, started = self._before_send(not rediscovered)
+                    try:
+                        response = request.request(endpoint, self._req_method_list, self.get_position(), request_id, self._get_timeout(deadline))
+                    except BaseException as e:
+                        self._after_send(endpoint, breaker, started, None, e)
+                        raise
+                    if self._after_send(endpoint, breaker, started, response):
+                        # re-discovered once per call, a still open circuit of the new api_url fails fast
+                        rediscovered = True
+                        attempt -= 1
+                        delay = self._reserve()
+                        continue
+                except ServerSideRequestThrottlingException:
+                    delay = self._on_throttled(deadline)
+                    if delay is None:
+                        raise
+                    continue
+                except Exception as e:
+                    delay = self._on_error(e, attempt, deadline)
+                    if delay is None:
+                        raise
+                    continue
+                self._on_success()
+                break
         except ServerBusyOrOfflineException as e:
+            if self._retry_policy:
+                raise
             self.log.info('Server seems to be busy or offline - try again!')
-
-        # cleanup after call execution
-        self.log.info('Cleanup of request!')
-        self._req_method_list = []
+        finally:
+            # cleanup after call execution
+            self.log.info('Cleanup of request!')
+            self._req_method_list = []
 
         return response
 
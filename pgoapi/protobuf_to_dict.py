@@ -6,8 +6,8 @@ from google.protobuf.message import Message
 from google.protobuf.descriptor import FieldDescriptor
 
 
-__all__ = ["protobuf_to_dict", "TYPE_CALLABLE_MAP", "dict_to_protobuf",
-           "REVERSE_TYPE_CALLABLE_MAP"]
+__all__ = ["protobuf_to_dict", "fast_protobuf_to_dict", "TYPE_CALLABLE_MAP",
+           "dict_to_protobuf", "REVERSE_TYPE_CALLABLE_MAP"]
 
 
 EXTENSION_CONTAINER = '___X'
@@ -80,6 +80,78 @@ def _get_field_value_adaptor(pb, field, type_callable_map=TYPE_CALLABLE_MAP, use
         pb.__class__.__name__, field.name, field.type))
 
 
+# adaptors which return the value protobuf already hands out unchanged
+_IDENTITY_CALLABLES = (int, float, bool, six.text_type) if six.PY3 else (float, bool, six.text_type)
+
+_compiled_converters = {}
+
+
+def fast_protobuf_to_dict(pb, type_callable_map=TYPE_CALLABLE_MAP, use_enum_labels=False):
+    """Same output as protobuf_to_dict, but the per-field adaptors are compiled
+    once per message descriptor and reused for every following message.
+    """
+    return _get_converter(pb.DESCRIPTOR, type_callable_map, use_enum_labels)(pb)
+
+
+def _get_converter(descriptor, type_callable_map, use_enum_labels):
+    key = (descriptor, id(type_callable_map), use_enum_labels)
+    try:
+        return _compiled_converters[key][0]
+    except KeyError:
+        return _compile_converter(key, descriptor, type_callable_map, use_enum_labels)
+
+
+def _compile_converter(key, descriptor, type_callable_map, use_enum_labels):
+    adaptors = {}
+
+    def converter(pb):
+        result_dict = {}
+        for field, value in pb.ListFields():
+            try:
+                adaptor = adaptors[field]
+            except KeyError:
+                # extensions or a not yet completed compilation - take the generic path
+                return protobuf_to_dict(pb, type_callable_map, use_enum_labels)
+            result_dict[field.name] = value if adaptor is None else adaptor(value)
+        return result_dict
+
+    # registered before the fields are compiled, so recursive messages resolve to it
+    _compiled_converters[key] = (converter, type_callable_map)
+
+    compiled = {}
+    for field in descriptor.fields:
+        compiled[field] = _compile_field_adaptor(descriptor, field, type_callable_map, use_enum_labels)
+    adaptors.update(compiled)
+
+    return converter
+
+
+def _compile_field_adaptor(descriptor, field, type_callable_map, use_enum_labels):
+    if field.message_type and field.message_type.has_options and field.message_type.GetOptions().map_entry:
+        return dict
+
+    if field.type == FieldDescriptor.TYPE_MESSAGE:
+        type_callable = _get_converter(field.message_type, type_callable_map, use_enum_labels)
+    elif use_enum_labels and field.type == FieldDescriptor.TYPE_ENUM:
+        values_by_number = field.enum_type.values_by_number
+        type_callable = lambda value: values_by_number[int(value)].name
+    elif field.type in type_callable_map:
+        type_callable = type_callable_map[field.type]
+    else:
+        raise TypeError("Field %s.%s has unrecognised type id %d" % (
+            descriptor.name, field.name, field.type))
+
+    identity = type_callable in _IDENTITY_CALLABLES
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        if identity:
+            return list
+        return lambda value_list: [type_callable(value) for value in value_list]
+
+    if identity:
+        return None
+    return type_callable
+
+
 def get_bytes(value):
     return base64.b64decode(value)
 
@@ -0,0 +1,182 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+from google.protobuf.descriptor import FieldDescriptor
+
+
+__all__ = ["ProtoObject", "protobuf_to_object", "get_object_class"]
+
+
+class ProtoObject(object):
+
+    """Lightweight read model of a protobuf message.
+
+    Fields are __slots__ of a class generated once per message descriptor,
+    unset fields fall back to the protobuf default (repeated: (), message: None).
+    """
+
+    __slots__ = ()
+
+    DESCRIPTOR = None
+    _defaults = {}
+
+    def __getattr__(self, name):
+        # only reached for slots which were never assigned
+        try:
+            return self._defaults[name]
+        except KeyError:
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, name))
+
+    def has_field(self, name):
+        try:
+            object.__getattribute__(self, name)
+            return True
+        except AttributeError:
+            return False
+
+    def to_dict(self):
+        result = {}
+        for name in self.__slots__:
+            if self.has_field(name):
+                result[name] = _to_dict_value(getattr(self, name))
+        return result
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join('{}={!r}'.format(name, getattr(self, name)) for name in self.__slots__ if self.has_field(name))
+        return '{}({})'.format(self.__class__.__name__, fields)
+
+
+def _to_dict_value(value):
+    if isinstance(value, ProtoObject):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_to_dict_value(v) for v in value]
+    return value
+
+
+_object_classes = {}
+_compiled_converters = {}
+
+
+def _is_map_field(field):
+    return field.message_type and field.message_type.has_options and field.message_type.GetOptions().map_entry
+
+
+def get_object_class(descriptor):
+    try:
+        return _object_classes[descriptor]
+    except KeyError:
+        pass
+
+    defaults = {}
+    for field in descriptor.fields:
+        if _is_map_field(field):
+            defaults[field.name] = None
+        elif field.label == FieldDescriptor.LABEL_REPEATED:
+            defaults[field.name] = ()
+        elif field.type == FieldDescriptor.TYPE_MESSAGE:
+            defaults[field.name] = None
+        else:
+            defaults[field.name] = field.default_value
+
+    cls = type(str(descriptor.name), (ProtoObject,), {
+        '__slots__': tuple(str(field.name) for field in descriptor.fields),
+        '__module__': __name__,
+        'DESCRIPTOR': descriptor,
+        '_defaults': defaults,
+    })
+
+    return _object_classes.setdefault(descriptor, cls)
+
+
+def protobuf_to_object(pb, use_enum_labels=False):
+    return _get_converter(pb.DESCRIPTOR, use_enum_labels)(pb)
+
+
+def _get_converter(descriptor, use_enum_labels):
+    key = (descriptor, use_enum_labels)
+    try:
+        return _compiled_converters[key]
+    except KeyError:
+        return _compile_converter(key, descriptor, use_enum_labels)
+
+
+def _compile_converter(key, descriptor, use_enum_labels):
+    cls = get_object_class(descriptor)
+    new = object.__new__
+    setter = object.__setattr__
+    adaptors = {}
+
+    def converter(pb):
+        obj = new(cls)
+        for field, value in pb.ListFields():
+            try:
+                name, adaptor = adaptors[field]
+            except KeyError:
+                # compilation still running in another thread
+                name, adaptor = adaptors[field] = (field.name, _compile_field_adaptor(field, use_enum_labels))
+            setter(obj, name, value if adaptor is None else adaptor(value))
+        return obj
+
+    # registered before the fields are compiled, so recursive messages resolve to it
+    _compiled_converters[key] = converter
+    for field in descriptor.fields:
+        adaptors[field] = (field.name, _compile_field_adaptor(field, use_enum_labels))
+
+    return converter
+
+
+def _compile_field_adaptor(field, use_enum_labels):
+    if _is_map_field(field):
+        value_field = field.message_type.fields_by_name['value']
+        if value_field.type == FieldDescriptor.TYPE_MESSAGE:
+            sub_converter = _get_converter(value_field.message_type, use_enum_labels)
+            return lambda value: dict((k, sub_converter(v)) for k, v in value.items())
+        return dict
+
+    if field.type == FieldDescriptor.TYPE_MESSAGE:
+        type_callable = _get_converter(field.message_type, use_enum_labels)
+    elif use_enum_labels and field.type == FieldDescriptor.TYPE_ENUM:
+        values_by_number = field.enum_type.values_by_number
+        type_callable = lambda value: values_by_number[int(value)].name
+    else:
+        type_callable = None
+
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        if type_callable is None:
+            return tuple
+        return lambda value_list: tuple(type_callable(value) for value in value_list)
+
+    return type_callable
@@ -0,0 +1,127 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+
+    """
+    Thread-safe token bucket: rate tokens per second, at most burst of them saved up.
+    reserve() takes a token right away and returns how long the caller has to wait for it,
+    so blocking callers use time.sleep() and asyncio callers asyncio.sleep() on the result.
+    """
+
+    def __init__(self, rate, burst = 1, clock = time.time):
+        self._rate = float(rate)
+        self._burst = float(burst)
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._tokens = self._burst
+        self._last = clock()
+
+    def get_rate(self):
+        return self._rate
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self._rate = float(rate)
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+    def reserve(self, tokens = 1):
+        with self._lock:
+            self._refill()
+            # tokens may go negative, later callers queue up behind the ones already waiting
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def release(self, tokens = 1):
+        # gives back reserved tokens which were not used (e.g. a retry given up on)
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._burst, self._tokens + tokens)
+
+
+_ip_buckets = {}
+_ip_buckets_lock = threading.Lock()
+
+
+def get_ip_bucket(ip, rate, burst = 1):
+    # one bucket per outgoing IP (or proxy), shared by all accounts using it
+    with _ip_buckets_lock:
+        bucket = _ip_buckets.get(ip)
+        if bucket is None:
+            bucket = _ip_buckets[ip] = TokenBucket(rate, burst)
+        return bucket
+
+
+class RateLimiter:
+
+    def __init__(self, rate = 3.0, burst = 3, ip = None, ip_rate = None, ip_burst = None):
+        self.log = logging.getLogger(__name__)
+
+        # per account limit, optionally combined with a limit shared by all accounts on one IP
+        self._bucket = TokenBucket(rate, burst)
+        self._ip_bucket = None
+        if ip is not None and ip_rate is not None:
+            self._ip_bucket = get_ip_bucket(ip, ip_rate, ip_burst or burst)
+
+    def get_rate(self):
+        return self._bucket.get_rate()
+
+    def set_rate(self, rate):
+        self._bucket.set_rate(rate)
+
+    def reserve(self):
+        delay = self._bucket.reserve()
+        if self._ip_bucket is not None:
+            delay = max(delay, self._ip_bucket.reserve())
+        return delay
+
+    def release(self):
+        self._bucket.release()
+        if self._ip_bucket is not None:
+            self._ip_bucket.release()
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            self.log.debug('Rate limit reached - waiting %.3f s', delay)
+            time.sleep(delay)
+        return delay
@@ -0,0 +1,154 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+from google.protobuf.message import Message
+from google.protobuf.descriptor import FieldDescriptor
+
+from pgoapi.exceptions import UnknownRequestTypeException, InvalidRequestArgumentException
+from pgoapi.protobuf_to_dict import dict_to_protobuf
+from pgoapi.utilities import to_camel_case
+
+from . import protos
+from POGOProtos.Networking.Requests_pb2 import RequestType
+from POGOProtos.Networking.Requests import Messages_pb2
+from POGOProtos.Networking import Responses_pb2
+
+# RequestType value -> *Message / *Response class, resolved once over the naming convention
+REQUEST_CLASSES = {}
+RESPONSE_CLASSES = {}
+
+# RequestType value -> compiled function building the *Message from the call kwargs
+REQUEST_BUILDERS = {}
+
+
+def _build_registry():
+    for name, value in RequestType.items():
+        proto_name = to_camel_case(name.lower())
+
+        request_class = getattr(Messages_pb2, proto_name + 'Message', None)
+        if request_class is not None:
+            REQUEST_CLASSES[value] = request_class
+
+        response_class = getattr(Responses_pb2, proto_name + 'Response', None)
+        if response_class is not None:
+            RESPONSE_CLASSES[value] = response_class
+
+_build_registry()
+
+
+def _type_name(request_type):
+    try:
+        return RequestType.Name(request_type)
+    except ValueError:
+        return str(request_type)
+
+
+def get_request_class(request_type):
+    try:
+        return REQUEST_CLASSES[request_type]
+    except KeyError:
+        raise UnknownRequestTypeException('No request message definition for {}'.format(_type_name(request_type)))
+
+
+def get_response_class(request_type):
+    try:
+        return RESPONSE_CLASSES[request_type]
+    except KeyError:
+        raise UnknownRequestTypeException('No response message definition for {}'.format(_type_name(request_type)))
+
+
+def get_request_builder(request_type):
+    try:
+        return REQUEST_BUILDERS[request_type]
+    except KeyError:
+        builder = _compile_request_builder(get_request_class(request_type))
+        return REQUEST_BUILDERS.setdefault(request_type, builder)
+
+
+def _compile_request_builder(request_class):
+    proto_name = request_class.__name__
+    setters = dict((field.name, _compile_field_setter(field)) for field in request_class.DESCRIPTOR.fields)
+
+    def build(arguments):
+        subrequest = request_class()
+        for key, value in arguments.items():
+            try:
+                setter = setters[key]
+            except KeyError:
+                raise InvalidRequestArgumentException('Argument {} unknown inside {} (valid: {})'.format(
+                    key, proto_name, ', '.join(sorted(setters)) or '-'))
+            try:
+                setter(subrequest, value)
+            except (TypeError, ValueError, KeyError) as e:
+                raise InvalidRequestArgumentException('Argument {} with value {} invalid inside {} ({})'.format(
+                    key, value, proto_name, str(e)))
+        return subrequest
+
+    return build
+
+
+def _compile_field_setter(field):
+    name = field.name
+
+    if field.message_type and field.message_type.has_options and field.message_type.GetOptions().map_entry:
+        def set_map(subrequest, value):
+            getattr(subrequest, name).update(value)
+        return set_map
+
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        if field.type == FieldDescriptor.TYPE_MESSAGE:
+            def set_repeated_message(subrequest, value):
+                container = getattr(subrequest, name)
+                for item in _as_list(value):
+                    if isinstance(item, Message):
+                        container.add().MergeFrom(item)
+                    else:
+                        dict_to_protobuf(container.add(), item)
+            return set_repeated_message
+
+        def set_repeated(subrequest, value):
+            getattr(subrequest, name).extend(_as_list(value))
+        return set_repeated
+
+    if field.type == FieldDescriptor.TYPE_MESSAGE:
+        def set_message(subrequest, value):
+            if isinstance(value, Message):
+                getattr(subrequest, name).CopyFrom(value)
+            else:
+                dict_to_protobuf(getattr(subrequest, name), value)
+        return set_message
+
+    def set_scalar(subrequest, value):
+        setattr(subrequest, name, value)
+    return set_scalar
+
+
+def _as_list(value):
+    # a single value for a repeated field is appended
+    if isinstance(value, (list, tuple)):
+        return value
+    return [value]
@@ -0,0 +1,124 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+
+from pgoapi.protobuf_to_dict import fast_protobuf_to_dict
+
+
+class _RawResponse(object):
+
+    __slots__ = ('response_class', 'data')
+
+    def __init__(self, response_class, data):
+        self.response_class = response_class
+        self.data = data
+
+
+class LazyResponses(dict):
+
+    """
+    Sub-responses by RequestType name, a dict whose values are parsed and converted on first access.
+    Until then the dict holds the raw bytes, reading them through __getitem__, get(), items() etc.
+    (and so json.dumps) decodes them.
+    """
+
+    def __init__(self, converter = fast_protobuf_to_dict):
+        dict.__init__(self)
+        self.log = logging.getLogger(__name__)
+
+        self._converter = converter
+
+    def add(self, name, response_class, raw):
+        dict.__setitem__(self, name, _RawResponse(response_class, raw))
+
+    def _decode(self, raw):
+        self.log.debug("Parsing class: %s", raw.response_class.__name__)
+        try:
+            subresponse_extension = raw.response_class()
+            subresponse_extension.ParseFromString(raw.data)
+            return self._converter(subresponse_extension)
+        except:
+            error = "Protobuf definition for {} seems not to match".format(raw.response_class.__name__)
+            self.log.debug(error)
+            return error
+
+    def __getitem__(self, name):
+        value = dict.__getitem__(self, name)
+        if isinstance(value, _RawResponse):
+            # the raw entry stays readable until the decoded value replaces it, concurrent readers
+            # may decode it twice but never see it missing
+            value = self._decode(value)
+            dict.__setitem__(self, name, value)
+        return value
+
+    def get(self, name, default = None):
+        if name in self:
+            return self[name]
+        return default
+
+    def pop(self, name, *default):
+        value = dict.pop(self, name, *default)
+        if isinstance(value, _RawResponse):
+            value = self._decode(value)
+        return value
+
+    def __iter__(self):
+        # not the iterator of dict, so dict(responses) and update() copy the decoded values
+        return iter(list(dict.keys(self)))
+
+    def items(self):
+        return [(name, self[name]) for name in dict.keys(self)]
+
+    def values(self):
+        return [self[name] for name in dict.keys(self)]
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def is_decoded(self, name):
+        return not isinstance(dict.__getitem__(self, name), _RawResponse)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def copy(self):
+        return self.to_dict()
+
+    def __eq__(self, other):
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.to_dict())
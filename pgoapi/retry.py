@@ -0,0 +1,62 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import random
+
+from pgoapi.exceptions import ServerBusyOrOfflineException, HttpStatusException
+
+
+class RetryPolicy:
+
+    """
+    Which failed calls are repeated and how long to wait in between: exponential backoff
+    (backoff * 2 ** (attempt - 1), at most max_backoff) of which the jitter part is randomized.
+    deadline bounds a call including all retries (seconds, None = only max_attempts) and the time each
+    attempt may wait for the server. All attempts of a call are sent with the same request id, so a retry
+    after a timeout of a call the server already processed (e.g. EVOLVE_POKEMON) is not run twice.
+    """
+
+    def __init__(self, max_attempts = 3, backoff = 0.5, max_backoff = 10.0, jitter = 0.5, deadline = None,
+                 retry_exceptions = (ServerBusyOrOfflineException, HttpStatusException),
+                 retry_status_codes = (500, 502, 503, 504)):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+
+        self.retry_exceptions = tuple(retry_exceptions)
+        self.retry_status_codes = frozenset(retry_status_codes)
+
+    def is_retryable(self, exception):
+        if isinstance(exception, HttpStatusException) and exception.status_code not in self.retry_status_codes:
+            return False
+        return isinstance(exception, self.retry_exceptions)
+
+    def get_delay(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
@@ -29,83 +29,91 @@ import re
 import base64
 import random
 import logging
-import requests
-import subprocess
+import itertools
 
 from google.protobuf import message
 
-from importlib import import_module
-
-from pgoapi.protobuf_to_dict import protobuf_to_dict
-from pgoapi.exceptions import NotLoggedInException, ServerBusyOrOfflineException, ServerSideRequestThrottlingException
-from pgoapi.utilities import f2i, h2f, to_camel_case, get_time_ms, get_format_time_diff
+from pgoapi.protobuf_to_dict import fast_protobuf_to_dict
+from pgoapi.protobuf_to_object import protobuf_to_object
+from pgoapi.transport import get_default_transport
+from pgoapi.exceptions import NotLoggedInException, ServerSideRequestThrottlingException, HttpStatusException, UnknownRequestTypeException
+from pgoapi.registry import get_request_builder, get_response_class
+from pgoapi.responses import LazyResponses
+from pgoapi.utilities import f2i, h2f, get_time_ms, get_format_time_diff
 
 from . import protos
 from POGOProtos.Networking.Envelopes_pb2 import RequestEnvelope
 from POGOProtos.Networking.Envelopes_pb2 import ResponseEnvelope
 from POGOProtos.Networking.Requests_pb2 import RequestType
 
-class RpcApi:
+ENVELOPE_HEAD = RequestEnvelope(status_code = 2).SerializeToString()
+
+# sub-requests which are sent with the same arguments on every call
+STATIC_SUBREQUESTS = frozenset([RequestType.Value('DOWNLOAD_SETTINGS')])
 
-    RPC_ID = 0
+# pre-serialized static sub-requests, the auth block is cached per RpcApi
+_static_subrequest_cache = {}
 
-    def __init__(self, auth_provider):
+# process wide request ids, next() on itertools.count is atomic so concurrent callers never share an id
+_rpc_ids = itertools.count(int(random.random() * 10 ** 18) + 1)
+
+class RpcApi:
+
+    def __init__(self, auth_provider, transport = None, wire_capture = None, typed_responses = False, raise_status_codes = ()):
 
         self.log = logging.getLogger(__name__)
 
-        self._session = requests.session()
-        self._session.headers.update({'User-Agent': 'Niantic App'})
-        self._session.verify = True
+        self._transport = transport or get_default_transport()
+        self._wire_capture = wire_capture
+
+        # sub-responses as ProtoObject instances instead of nested dicts
+        self._response_converter = protobuf_to_object if typed_responses else fast_protobuf_to_dict
+
+        # HTTP status codes raising HttpStatusException instead of returning False (e.g. to retry them)
+        self._raise_status_codes = raise_status_codes
 
         self._auth_provider = auth_provider
 
-        if RpcApi.RPC_ID == 0:
-            RpcApi.RPC_ID = int(random.random() * 10 ** 18)
-            self.log.debug('Generated new random RPC Request id: %s', RpcApi.RPC_ID)
+        # (auth state, serialized auth block + unknown12) of the last call, rebuilt when the token changes
+        self._auth_block = (None, None)
 
     def get_rpc_id(self):
-        RpcApi.RPC_ID += 1
-        self.log.debug("Incremented RPC Request ID: %s", RpcApi.RPC_ID)
+        rpc_id = next(_rpc_ids)
+        self.log.debug("Incremented RPC Request ID: %s", rpc_id)
 
-        return RpcApi.RPC_ID
+        return rpc_id
 
-    def decode_raw(self, raw):
-        output = error = None
-        try:
-            process = subprocess.Popen(['protoc', '--decode_raw'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            output, error = process.communicate(raw)
-        except:
-            output = "Couldn't find protoc in your environment OR other issue..."
-
-        return output
+    def _make_rpc(self, endpoint, request_proto_serialized, timeout = None):
+        self.log.debug('Execution of RPC')
 
-    def get_class(self, cls):
-        module_, class_ = cls.rsplit('.', 1)
-        class_ = getattr(import_module(module_), class_)
-        return class_
+        if self._wire_capture:
+            self._wire_capture.write_request(request_proto_serialized)
 
-    def _make_rpc(self, endpoint, request_proto_plain):
-        self.log.debug('Execution of RPC')
+        # transports without a timeout argument keep working as long as calls have no deadline
+        if timeout is None:
+            status_code, content = self._transport.send(endpoint, request_proto_serialized)
+        else:
+            status_code, content = self._transport.send(endpoint, request_proto_serialized, timeout)
 
-        request_proto_serialized = request_proto_plain.SerializeToString()
-        try:
-            http_response = self._session.post(endpoint, data=request_proto_serialized)
-        except requests.exceptions.ConnectionError as e:
-            raise ServerBusyOrOfflineException
+        if self._wire_capture:
+            self._wire_capture.write_response(content)
 
-        return http_response
+        return (status_code, content)
 
-    def request(self, endpoint, subrequests, player_position):
+    def request(self, endpoint, subrequests, player_position, request_id = None, timeout = None):
 
         if not self._auth_provider or self._auth_provider.is_login() is False:
             raise NotLoggedInException()
 
-        request_proto = self._build_main_request(subrequests, player_position)
-        response = self._make_rpc(endpoint, request_proto)
+        request_proto = self._build_main_request(subrequests, player_position, request_id)
+        status_code, content = self._make_rpc(endpoint, request_proto, timeout)
+
+        return self._handle_main_response(status_code, content, subrequests)
 
-        response_dict = self._parse_main_response(response, subrequests)
+    def _handle_main_response(self, status_code, content, subrequests):
+        response_dict = self._parse_main_response(status_code, content, subrequests)
 
-        if ('auth_ticket' in response_dict) and ('expire_timestamp_ms' in response_dict['auth_ticket']) and (self._auth_provider.is_new_ticket(response_dict['auth_ticket']['expire_timestamp_ms'])):
+        if response_dict and ('auth_ticket' in response_dict) and ('expire_timestamp_ms' in response_dict['auth_ticket']) and (self._auth_provider.is_new_ticket(response_dict['auth_ticket']['expire_timestamp_ms'])):
             had_ticket = self._auth_provider.has_ticket()
 
             auth_ticket = response_dict['auth_ticket']
@@ -129,36 +137,62 @@ class RpcApi:
 
         return response_dict
 
-    def _build_main_request(self, subrequests, player_position = None):
+    def _build_main_request(self, subrequests, player_position = None, request_id = None):
         self.log.debug('Generating main RPC request...')
 
+        # serialized fields of an envelope can be concatenated in field number order,
+        # so only request id, sub-requests and position are serialized per call
+        parts = [ENVELOPE_HEAD]
+
         request = RequestEnvelope()
-        request.status_code = 2
-        request.request_id = self.get_rpc_id()
+        request.request_id = request_id or self.get_rpc_id()
+        parts.append(request.SerializeToString())
+
+        self._build_sub_requests(parts, subrequests)
 
         if player_position is not None:
+            request = RequestEnvelope()
             request.latitude, request.longitude, request.altitude = player_position
+            parts.append(request.SerializeToString())
 
+        parts.append(self._get_auth_block())
+
+        request_serialized = b''.join(parts)
+
+        if self.log.isEnabledFor(logging.DEBUG):
+            request = RequestEnvelope()
+            request.ParseFromString(request_serialized)
+            self.log.debug('Generated protobuf request: \n\r%s', request )
+
+        return request_serialized
+
+    def _get_auth_block(self):
         ticket = self._auth_provider.get_ticket()
         if ticket:
             self.log.debug('Found auth ticket - using this instead of oauth token')
-            request.auth_ticket.expire_timestamp_ms, request.auth_ticket.start, request.auth_ticket.end = ticket
+            key = ticket
         else:
             self.log.debug('NO auth ticket found - using oauth token')
-            request.auth_info.provider = self._auth_provider.get_name()
-            request.auth_info.token.contents = self._auth_provider.get_token()
-            request.auth_info.token.unknown2 = 59
+            key = (self._auth_provider.get_name(), self._auth_provider.get_token())
 
-        # unknown stuff
-        request.unknown12 = 989
+        cached_key, auth_block = self._auth_block
+        if auth_block is None or cached_key != key:
+            request = RequestEnvelope()
+            if ticket:
+                request.auth_ticket.expire_timestamp_ms, request.auth_ticket.start, request.auth_ticket.end = ticket
+            else:
+                request.auth_info.provider, request.auth_info.token.contents = key
+                request.auth_info.token.unknown2 = 59
 
-        request = self._build_sub_requests(request, subrequests)
+            # unknown stuff
+            request.unknown12 = 989
 
-        self.log.debug('Generated protobuf request: \n\r%s', request )
+            auth_block = request.SerializeToString()
+            self._auth_block = (key, auth_block)
 
-        return request
+        return auth_block
 
-    def _build_sub_requests(self, mainrequest, subrequest_list):
+    def _build_sub_requests(self, parts, subrequest_list):
         self.log.debug('Generating sub RPC requests...')
 
         for entry in subrequest_list:
@@ -167,95 +201,82 @@ class RpcApi:
                 entry_id = list(entry.items())[0][0]
                 entry_content = entry[entry_id]
 
-                entry_name = RequestType.Name(entry_id)
-
-                proto_name = to_camel_case(entry_name.lower()) + 'Message'
-                proto_classname = 'POGOProtos.Networking.Requests.Messages_pb2.' + proto_name
-                subrequest_extension = self.get_class(proto_classname)()
-
-                self.log.debug("Subrequest class: %s", proto_classname)
-
-                for (key, value) in entry_content.items():
-                    if isinstance(value, list):
-                        self.log.debug("Found list: %s - trying as repeated", key)
-                        for i in value:
-                            try:
-                                self.log.debug("%s -> %s", key, i)
-                                r = getattr(subrequest_extension, key)
-                                r.append(i)
-                            except Exception as e:
-                                self.log.warning('Argument %s with value %s unknown inside %s (Exception: %s)', key, i, proto_name, str(e))
-                    elif isinstance(value, dict):
-                        for k in value.keys():
-                            try:
-                                r = getattr(subrequest_extension, key)
-                                setattr(r, k, value[k])
-                            except Exception as e:
-                                self.log.warning('Argument %s with value %s unknown inside %s (Exception: %s)', key, str(value), proto_name, str(e))
-                    else:
-                        try:
-                            setattr(subrequest_extension, key, value)
-                        except Exception as e:
-                            try:
-                                self.log.debug("%s -> %s", key, value)
-                                r = getattr(subrequest_extension, key)
-                                r.append(value)
-                            except Exception as e:
-                                self.log.warning('Argument %s with value %s unknown inside %s (Exception: %s)', key, value, proto_name, str(e))
-
-                subrequest = mainrequest.requests.add()
+                key = None
+                if entry_id in STATIC_SUBREQUESTS:
+                    key = (entry_id, tuple(sorted(entry_content.items())))
+                    subrequest_serialized = _static_subrequest_cache.get(key)
+                    if subrequest_serialized is not None:
+                        parts.append(subrequest_serialized)
+                        continue
+
+                # fails before sending, the server would act on a sub-request whose response can not be parsed
+                get_response_class(entry_id)
+                subrequest_extension = get_request_builder(entry_id)(entry_content)
+
+                request = RequestEnvelope()
+                subrequest = request.requests.add()
                 subrequest.request_type = entry_id
                 subrequest.request_message = subrequest_extension.SerializeToString()
+                subrequest_serialized = request.SerializeToString()
+
+                if key is not None:
+                    _static_subrequest_cache[key] = subrequest_serialized
 
             elif isinstance(entry, int):
-                subrequest = mainrequest.requests.add()
-                subrequest.request_type = entry
+                subrequest_serialized = _static_subrequest_cache.get(entry)
+                if subrequest_serialized is None:
+                    get_response_class(entry)
+
+                    request = RequestEnvelope()
+                    request.requests.add().request_type = entry
+                    subrequest_serialized = _static_subrequest_cache[entry] = request.SerializeToString()
             else:
                 raise Exception('Unknown value in request list')
 
-        return mainrequest
+            parts.append(subrequest_serialized)
+
+        return parts
 
 
-    def _parse_main_response(self, response_raw, subrequests):
+    def _parse_main_response(self, status_code, content, subrequests):
         self.log.debug('Parsing main RPC response...')
 
-        if response_raw.status_code != 200:
-            self.log.warning('Unexpected HTTP server response - needs 200 got %s', response_raw.status_code)
-            self.log.debug('HTTP output: \n%s', response_raw.content.decode('utf-8'))
+        if status_code != 200:
+            if status_code in self._raise_status_codes:
+                raise HttpStatusException(status_code)
+            self.log.warning('Unexpected HTTP server response - needs 200 got %s', status_code)
+            self.log.debug('HTTP output: \n%s', content.decode('utf-8', 'replace'))
             return False
 
-        if response_raw.content is None:
+        if content is None:
             self.log.warning('Empty server response!')
             return False
 
         response_proto = ResponseEnvelope()
         try:
-            response_proto.ParseFromString(response_raw.content)
+            response_proto.ParseFromString(content)
         except message.DecodeError as e:
             self.log.warning('Could not parse response: %s', str(e))
             return False
 
         self.log.debug('Protobuf structure of rpc response:\n\r%s', response_proto)
-        try:
-            self.log.debug('Decode raw over protoc (protoc has to be in your PATH):\n\r%s', self.decode_raw(response_raw.content).decode('utf-8'))
-        except:
-            self.log.debug('Error during protoc parsing - ignored.')
 
-        response_proto_dict = protobuf_to_dict(response_proto)
-        response_proto_dict = self._parse_sub_responses(response_proto, subrequests, response_proto_dict)
+        # the sub-responses are kept raw and only decoded on access
+        returns = list(response_proto.returns)
+        response_proto.ClearField('returns')
+
+        response_proto_dict = fast_protobuf_to_dict(response_proto)
+        response_proto_dict = self._parse_sub_responses(returns, subrequests, response_proto_dict)
 
         return response_proto_dict
 
-    def _parse_sub_responses(self, response_proto, subrequests_list, response_proto_dict):
+    def _parse_sub_responses(self, returns, subrequests_list, response_proto_dict):
         self.log.debug('Parsing sub RPC responses...')
-        response_proto_dict['responses'] = {}
-
-        if 'returns' in response_proto_dict:
-            del response_proto_dict['returns']
+        responses = LazyResponses(self._response_converter)
 
         list_len = len(subrequests_list) -1
         i = 0
-        for subresponse in response_proto.returns:
+        for subresponse in returns:
             if i > list_len:
                 self.log.info("Error - something strange happend...")
 
@@ -266,30 +287,14 @@ class RpcApi:
                 entry_id =  list(request_entry.items())[0][0]
 
             entry_name = RequestType.Name(entry_id)
-            proto_name = to_camel_case(entry_name.lower()) + 'Response'
-            proto_classname = 'POGOProtos.Networking.Responses_pb2.' + proto_name
-
-            self.log.debug("Parsing class: %s", proto_classname)
-
-            subresponse_return = None
             try:
-                subresponse_extension = self.get_class(proto_classname)()         
-            except Exception as e:
-                subresponse_extension = None
-                error = 'Protobuf definition for {} not found'.format(proto_classname)
-                subresponse_return = error
-                self.log.debug(error)
-
-            if subresponse_extension:
-                try: 
-                    subresponse_extension.ParseFromString(subresponse)
-                    subresponse_return = protobuf_to_dict(subresponse_extension)
-                except:
-                    error = "Protobuf definition for {} seems not to match".format(proto_classname)
-                    subresponse_return = error
-                    self.log.debug(error)
-
-            response_proto_dict['responses'][entry_name] = subresponse_return
+                responses.add(entry_name, get_response_class(entry_id), subresponse)
+            except UnknownRequestTypeException as e:
+                # the envelope was already processed, the other sub-responses and the auth ticket are kept
+                responses[entry_name] = str(e)
+                self.log.debug(str(e))
             i += 1
 
+        response_proto_dict['responses'] = responses
+
         return response_proto_dict
@@ -0,0 +1,176 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import math
+import logging
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from pgoapi.exceptions import PleaseInstallNumpy
+
+EARTH_RADIUS_M = 6371010.0
+METERS_PER_DEGREE = EARTH_RADIUS_M * math.pi / 180
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    # haversine distance in metres
+    lat1, lng1, lat2, lng2 = math.radians(lat1), math.radians(lng1), math.radians(lat2), math.radians(lng2)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+
+    """
+    Grid of objects by position for radius and k-nearest queries in metres. Rows are cell_size metres
+    high, the columns of a row are widened towards the poles so buckets stay about cell_size wide.
+    Objects are inserted, moved and removed by key as map cells arrive.
+    """
+
+    def __init__(self, cell_size = 250):
+        self.log = logging.getLogger(__name__)
+
+        self._cell_deg = float(cell_size) / METERS_PER_DEGREE
+        # row -> column -> key -> (lat, lng, obj)
+        self._rows = {}
+        # key -> (row, column)
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def _get_row(self, lat):
+        return int(math.floor(lat / self._cell_deg))
+
+    def _get_column_deg(self, row):
+        # narrowest latitude of the row, so a column is at least cell_size wide
+        lat = max(abs(row * self._cell_deg), abs((row + 1) * self._cell_deg))
+        return self._cell_deg / max(math.cos(math.radians(min(lat, 90.0))), 1e-6)
+
+    def _get_bucket(self, lat, lng):
+        row = self._get_row(lat)
+        return (row, int(math.floor(lng / self._get_column_deg(row))))
+
+    def insert(self, key, lat, lng, obj = None):
+        # adds or moves the object with this key
+        bucket = self._get_bucket(lat, lng)
+        with self._lock:
+            self._remove(key)
+            self._rows.setdefault(bucket[0], {}).setdefault(bucket[1], {})[key] = (lat, lng, obj)
+            self._keys[key] = bucket
+
+    def remove(self, key):
+        with self._lock:
+            return self._remove(key)
+
+    def _remove(self, key):
+        bucket = self._keys.pop(key, None)
+        if bucket is None:
+            return False
+
+        row, column = bucket
+        columns = self._rows[row]
+        del columns[column][key]
+        if not columns[column]:
+            del columns[column]
+            if not columns:
+                del self._rows[row]
+        return True
+
+    def get(self, key, default = None):
+        with self._lock:
+            bucket = self._keys.get(key)
+            if bucket is None:
+                return default
+            return self._rows[bucket[0]][bucket[1]][key][2]
+
+    def clear(self):
+        with self._lock:
+            self._rows = {}
+            self._keys = {}
+
+    def query_radius(self, lat, lng, radius):
+        # [(distance, key, obj)] within radius metres, nearest first
+        radius_deg = float(radius) / METERS_PER_DEGREE
+        result = []
+        with self._lock:
+            for row in range(self._get_row(lat - radius_deg), self._get_row(lat + radius_deg) + 1):
+                columns = self._rows.get(row)
+                if not columns:
+                    continue
+
+                # longitude degrees of radius at the narrowest latitude of the row
+                column_deg = self._get_column_deg(row)
+                lng_span = radius_deg * column_deg / self._cell_deg
+                if abs(lng) + lng_span > 180 or 2 * lng_span / column_deg >= len(columns):
+                    buckets = list(columns.values())
+                else:
+                    first = int(math.floor((lng - lng_span) / column_deg))
+                    last = int(math.floor((lng + lng_span) / column_deg))
+                    buckets = [columns[column] for column in range(first, last + 1) if column in columns]
+
+                for bucket in buckets:
+                    for key, (obj_lat, obj_lng, obj) in bucket.items():
+                        distance = distance_m(lat, lng, obj_lat, obj_lng)
+                        if distance <= radius:
+                            result.append((distance, key, obj))
+
+        result.sort(key = lambda entry: entry[0])
+        return result
+
+    def nearest(self, lat, lng, k = 1, max_radius = None):
+        # [(distance, key, obj)] of the k nearest objects, the search radius doubles until k are found
+        radius = self._cell_deg * METERS_PER_DEGREE
+        limit = max_radius or math.pi * EARTH_RADIUS_M
+        while True:
+            result = self.query_radius(lat, lng, min(radius, limit))
+            if len(result) >= k or radius >= limit or len(result) == len(self._keys):
+                return result[:k]
+            radius *= 2
+
+    def to_numpy(self):
+        # (keys, array of [lat, lng] rows in the order of keys) for bulk processing, e.g. clustering
+        if numpy is None:
+            raise PleaseInstallNumpy()
+
+        with self._lock:
+            keys = []
+            positions = []
+            for columns in self._rows.values():
+                for bucket in columns.values():
+                    for key, (lat, lng, obj) in bucket.items():
+                        keys.append(key)
+                        positions.append((lat, lng))
+        return keys, numpy.array(positions, dtype = float).reshape(-1, 2)
@@ -0,0 +1,642 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import os
+import math
+import time
+import random
+import logging
+import argparse
+import threading
+
+from six.moves import BaseHTTPServer, socketserver
+from google.protobuf.message import DecodeError
+from s2sphere import CellId
+
+from pgoapi.transport import Transport
+from pgoapi.registry import get_request_class, get_response_class
+from pgoapi.exceptions import UnknownRequestTypeException
+
+from . import protos
+from POGOProtos.Networking.Envelopes_pb2 import RequestEnvelope, ResponseEnvelope
+from POGOProtos.Networking.Requests_pb2 import RequestType
+from POGOProtos.Inventory_pb2 import InventoryItemData
+from POGOProtos.Inventory.Item_pb2 import ItemId
+
+log = logging.getLogger(__name__)
+
+TICKET_LIFETIME_MS = 30 * 60 * 1000
+SPAWN_WINDOW_MS = 15 * 60 * 1000
+FORT_SEARCH_RANGE_M = 40
+FORT_COOLDOWN_MS = 5 * 60 * 1000
+EVOLVE_CANDY = 12
+
+# what a fresh account owns
+START_ITEMS = {
+    ItemId.Value('ITEM_POKE_BALL'): 50,
+    ItemId.Value('ITEM_POTION'): 10,
+    ItemId.Value('ITEM_RAZZ_BERRY'): 5,
+    ItemId.Value('ITEM_LUCKY_EGG'): 1,
+    ItemId.Value('ITEM_INCUBATOR_BASIC_UNLIMITED'): 1,
+}
+
+FORT_SEARCH_AWARD = [ItemId.Value('ITEM_POKE_BALL'), ItemId.Value('ITEM_POTION'), ItemId.Value('ITEM_RAZZ_BERRY')]
+POKEBALLS = [ItemId.Value('ITEM_POKE_BALL'), ItemId.Value('ITEM_GREAT_BALL'), ItemId.Value('ITEM_ULTRA_BALL'), ItemId.Value('ITEM_MASTER_BALL')]
+
+
+def _distance_m(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371009 * math.asin(math.sqrt(a))
+
+
+class StandinPlayer:
+
+    def __init__(self, username, now_ms):
+        self.username = username
+        self.creation_timestamp_ms = now_ms
+        self.requests_ms = []
+
+        # inventory key -> (modified timestamp, InventoryItemData), removed pokemon leave a tombstone
+        self.inventory = {}
+        self.deleted = {}
+        self.timestamp_ms = now_ms
+
+        self.level = 1
+        self.experience = 0
+        self.stardust = 0
+        self.fort_cooldown = {}
+        self.encounters = {}
+
+        for item_id, count in START_ITEMS.items():
+            self.set_item(item_id, count, now_ms)
+        self.set_stats(now_ms)
+
+        incubators = InventoryItemData()
+        incubators.egg_incubators.egg_incubator.add(id='EggIncubatorProto-standin', item_id=ItemId.Value('ITEM_INCUBATOR_BASIC_UNLIMITED'),
+                                                    incubator_type=1, uses_remaining=0)
+        self.touch('egg_incubators', incubators, now_ms)
+
+    def touch(self, key, data, now_ms):
+        self.timestamp_ms = max(now_ms, self.timestamp_ms + 1)
+        self.inventory[key] = (self.timestamp_ms, data)
+        self.deleted.pop(key, None)
+
+    def remove(self, key, now_ms):
+        self.timestamp_ms = max(now_ms, self.timestamp_ms + 1)
+        self.inventory.pop(key, None)
+        self.deleted[key] = self.timestamp_ms
+
+    def get_data(self, key):
+        entry = self.inventory.get(key)
+        return entry[1] if entry else None
+
+    def get_item_count(self, item_id):
+        data = self.get_data(('item', item_id))
+        return data.item.count if data else 0
+
+    def set_item(self, item_id, count, now_ms):
+        data = InventoryItemData()
+        data.item.item_id = item_id
+        data.item.count = max(count, 0)
+        self.touch(('item', item_id), data, now_ms)
+
+    def get_candy(self, family_id):
+        data = self.get_data(('candy', family_id))
+        return data.candy.candy if data else 0
+
+    def set_candy(self, family_id, candy, now_ms):
+        data = InventoryItemData()
+        data.candy.family_id = family_id
+        data.candy.candy = candy
+        self.touch(('candy', family_id), data, now_ms)
+
+    def add_experience(self, experience, now_ms):
+        self.experience += experience
+        self.level = min(40, 1 + self.experience // 1000)
+        self.set_stats(now_ms)
+
+    def set_stats(self, now_ms):
+        data = InventoryItemData()
+        stats = data.player_stats
+        stats.level = self.level
+        stats.experience = self.experience
+        stats.prev_level_xp = (self.level - 1) * 1000
+        stats.next_level_xp = self.level * 1000
+        self.touch('player_stats', data, now_ms)
+
+    def get_pokemon(self, pokemon_id):
+        data = self.get_data(pokemon_id)
+        return data.pokemon_data if data else None
+
+
+class StandinServer:
+
+    """
+    Plays the server side of the RPC protocol: parses RequestEnvelopes, dispatches the sub-requests
+    by RequestType and answers with ResponseEnvelopes - deterministic per seed and without network.
+    """
+
+    def __init__(self, seed = 0, rate_limit = None, api_url = 'pgorelease.nianticlabs.com/custom'):
+        self.log = logging.getLogger(__name__)
+
+        self._seed = seed
+        # max. requests per second and player, exceeding it is answered with status code 52
+        self._rate_limit = rate_limit
+        self._api_url = api_url
+
+        self._lock = threading.Lock()
+        self._players = {}
+        self._tickets = {}
+        self._forts = {}
+        self._random = random.Random(seed)
+
+        self.request_count = 0
+
+    def get_api_url(self):
+        return self._api_url
+
+    def set_api_url(self, api_url):
+        self._api_url = api_url
+
+    def get_player(self, provider, token):
+        return self._players.get((provider, token))
+
+    def now_ms(self):
+        return int(round(time.time() * 1000))
+
+    def handle(self, endpoint, data):
+        if not endpoint.endswith('/rpc'):
+            return (404, b'Not Found')
+
+        request = RequestEnvelope()
+        try:
+            request.ParseFromString(data)
+        except DecodeError as e:
+            self.log.debug('Could not parse request envelope: %s', str(e))
+            return (400, b'Bad Request')
+
+        with self._lock:
+            self.request_count += 1
+            response = self._handle_envelope(endpoint, request)
+
+        return (200, response.SerializeToString())
+
+    def _handle_envelope(self, endpoint, request):
+        response = ResponseEnvelope(request_id=request.request_id)
+        now_ms = self.now_ms()
+
+        if request.HasField('auth_info'):
+            key = (request.auth_info.provider, request.auth_info.token.contents)
+            player = self._players.get(key)
+            if player is None:
+                player = self._players[key] = StandinPlayer(key[1][:15] or 'standin', now_ms)
+
+            # the first token based call issues a ticket and the endpoint to use from now on
+            ticket = response.auth_ticket
+            ticket.start = os.urandom(16)
+            ticket.end = os.urandom(16)
+            ticket.expire_timestamp_ms = now_ms + TICKET_LIFETIME_MS
+            self._tickets[ticket.end] = (ticket.expire_timestamp_ms, player)
+
+            response.status_code = 53
+            response.api_url = self._api_url
+        else:
+            player = None
+            expire_timestamp_ms, owner = self._tickets.get(request.auth_ticket.end, (0, None))
+            if owner is not None and expire_timestamp_ms > now_ms:
+                player = owner
+
+            if player is None:
+                response.status_code = 102
+                return response
+            response.status_code = 1
+
+            # the entry endpoint only points to the endpoint to use, the sub-requests are not executed
+            if '/plfe/' in endpoint:
+                response.status_code = 53
+                response.api_url = self._api_url
+                return response
+
+        if self._rate_limit:
+            player.requests_ms = [ms for ms in player.requests_ms if ms > now_ms - 1000]
+            if len(player.requests_ms) >= self._rate_limit:
+                response.status_code = 52
+                return response
+            player.requests_ms.append(now_ms)
+
+        for subrequest in request.requests:
+            response.returns.append(self._handle_subrequest(player, subrequest, request, now_ms))
+
+        return response
+
+    def _handle_subrequest(self, player, subrequest, envelope, now_ms):
+        try:
+            message = get_request_class(subrequest.request_type)()
+            response = get_response_class(subrequest.request_type)()
+        except UnknownRequestTypeException as e:
+            self.log.debug('%s', str(e))
+            return b''
+
+        message.ParseFromString(subrequest.request_message)
+
+        handler = getattr(self, '_' + RequestType.Name(subrequest.request_type).lower(), None)
+        if handler is not None:
+            handler(player, message, response, envelope, now_ms)
+
+        return response.SerializeToString()
+
+    def _get_player(self, player, message, response, envelope, now_ms):
+        response.success = True
+        data = response.player_data
+        data.creation_timestamp_ms = player.creation_timestamp_ms
+        data.username = player.username
+        data.max_pokemon_storage = 250
+        data.max_item_storage = 350
+        data.currencies.add(name='POKECOIN', amount=0)
+        data.currencies.add(name='STARDUST', amount=player.stardust)
+
+    def _get_hatched_eggs(self, player, message, response, envelope, now_ms):
+        response.success = True
+
+    def _check_awarded_badges(self, player, message, response, envelope, now_ms):
+        response.success = True
+
+    def _download_settings(self, player, message, response, envelope, now_ms):
+        response.hash = message.hash or '05daf51635c82611d1aac95c0b051d3ec088a930'
+        response.settings.map_settings.pokemon_visible_range = 70
+        response.settings.map_settings.poke_nav_range_meters = 200
+        response.settings.map_settings.encounter_range_meters = 50
+        response.settings.map_settings.get_map_objects_min_refresh_seconds = 10
+        response.settings.map_settings.get_map_objects_max_refresh_seconds = 30
+        response.settings.map_settings.get_map_objects_min_distance_meters = 10
+
+    def _get_inventory(self, player, message, response, envelope, now_ms):
+        response.success = True
+        delta = response.inventory_delta
+        delta.original_timestamp_ms = message.last_timestamp_ms
+        delta.new_timestamp_ms = player.timestamp_ms
+
+        since = message.last_timestamp_ms
+        for key, (modified_ms, data) in sorted(player.inventory.items(), key=lambda entry: entry[1][0]):
+            if modified_ms > since:
+                delta.inventory_items.add(modified_timestamp_ms=modified_ms).inventory_item_data.CopyFrom(data)
+
+        # tombstones only make sense for a client holding an older state
+        if since:
+            for key, deleted_ms in player.deleted.items():
+                if deleted_ms > since:
+                    delta.inventory_items.add(modified_timestamp_ms=deleted_ms, deleted_item_key=key)
+
+    def _get_cell_objects(self, cell_id, now_ms):
+        # the content of a cell only depends on its id, the seed and the current spawn window
+        rnd = random.Random(cell_id ^ self._seed)
+        window = now_ms // SPAWN_WINDOW_MS
+        center = CellId(cell_id).to_lat_lng()
+        lat, lng = center.lat().degrees, center.lng().degrees
+
+        def jitter():
+            return (lat + rnd.uniform(-0.001, 0.001), lng + rnd.uniform(-0.001, 0.001))
+
+        forts = []
+        for i in range(rnd.randint(0, 2)):
+            fort_lat, fort_lng = jitter()
+            forts.append({'id': '{:x}.{}'.format(cell_id, i), 'latitude': fort_lat, 'longitude': fort_lng,
+                          'type': 1 if rnd.random() < 0.8 else 0, 'last_modified_timestamp_ms': self._seed * 1000 + 1})
+
+        spawns = []
+        for i in range(rnd.randint(0, 3)):
+            spawn_lat, spawn_lng = jitter()
+            spawns.append(('{:x}{:x}'.format(cell_id, i), spawn_lat, spawn_lng))
+
+        pokemons = []
+        for spawn_point_id, spawn_lat, spawn_lng in spawns:
+            spawn_rnd = random.Random('{}:{}:{}'.format(spawn_point_id, window, self._seed))
+            if spawn_rnd.random() < 0.5:
+                encounter_id = spawn_rnd.getrandbits(63)
+                pokemons.append({'encounter_id': encounter_id, 'spawn_point_id': spawn_point_id, 'pokemon_id': spawn_rnd.randint(1, 151),
+                                 'latitude': spawn_lat, 'longitude': spawn_lng,
+                                 'expiration_timestamp_ms': (window + 1) * SPAWN_WINDOW_MS})
+
+        return forts, spawns, pokemons
+
+    def _get_map_objects(self, player, message, response, envelope, now_ms):
+        response.status = 1
+        since_list = list(message.since_timestamp_ms) + [0] * (len(message.cell_id) - len(message.since_timestamp_ms))
+
+        for cell_id, since in zip(message.cell_id, since_list):
+            forts, spawns, pokemons = self._get_cell_objects(cell_id, now_ms)
+            cell = response.map_cells.add(s2_cell_id=cell_id, current_timestamp_ms=now_ms)
+
+            for fort in forts:
+                self._forts[fort['id']] = fort
+                if fort['last_modified_timestamp_ms'] > since:
+                    cell.forts.add(enabled=True, cooldown_complete_timestamp_ms=player.fort_cooldown.get(fort['id'], 0), **fort)
+
+            for spawn_point_id, spawn_lat, spawn_lng in spawns:
+                cell.spawn_points.add(latitude=spawn_lat, longitude=spawn_lng)
+
+            for pokemon in pokemons:
+                player.encounters[pokemon['encounter_id']] = pokemon
+                distance = _distance_m(envelope.latitude, envelope.longitude, pokemon['latitude'], pokemon['longitude'])
+                time_till_hidden_ms = int(pokemon['expiration_timestamp_ms'] - now_ms)
+
+                if distance <= 100:
+                    wild = cell.wild_pokemons.add(encounter_id=pokemon['encounter_id'], last_modified_timestamp_ms=now_ms,
+                                                  latitude=pokemon['latitude'], longitude=pokemon['longitude'],
+                                                  spawn_point_id=pokemon['spawn_point_id'], time_till_hidden_ms=time_till_hidden_ms)
+                    wild.pokemon_data.pokemon_id = pokemon['pokemon_id']
+                if distance <= 70:
+                    cell.catchable_pokemons.add(**pokemon)
+                if distance <= 200:
+                    cell.nearby_pokemons.add(pokemon_id=pokemon['pokemon_id'], distance_in_meters=distance,
+                                             encounter_id=pokemon['encounter_id'])
+
+    def _fort_search(self, player, message, response, envelope, now_ms):
+        fort = self._forts.get(message.fort_id)
+        if fort is None or fort['type'] != 1:
+            response.result = 2
+        elif _distance_m(message.player_latitude, message.player_longitude, fort['latitude'], fort['longitude']) > FORT_SEARCH_RANGE_M:
+            response.result = 2
+        elif player.fort_cooldown.get(fort['id'], 0) > now_ms:
+            response.result = 3
+        else:
+            response.result = 1
+            response.experience_awarded = 50
+            response.cooldown_complete_timestamp_ms = player.fort_cooldown[fort['id']] = now_ms + FORT_COOLDOWN_MS
+            for item_id in self._random.sample(FORT_SEARCH_AWARD, 2):
+                response.items_awarded.add(item_id=item_id, item_count=1)
+                player.set_item(item_id, player.get_item_count(item_id) + 1, now_ms)
+            player.add_experience(response.experience_awarded, now_ms)
+
+    def _encounter(self, player, message, response, envelope, now_ms):
+        pokemon = player.encounters.get(message.encounter_id)
+        if pokemon is None or pokemon['expiration_timestamp_ms'] <= now_ms:
+            response.status = 2
+            return
+
+        response.status = 1
+        wild = response.wild_pokemon
+        wild.encounter_id = pokemon['encounter_id']
+        wild.spawn_point_id = pokemon['spawn_point_id']
+        wild.latitude, wild.longitude = pokemon['latitude'], pokemon['longitude']
+        wild.pokemon_data.pokemon_id = pokemon['pokemon_id']
+        wild.pokemon_data.cp = 10 + pokemon['encounter_id'] % 500
+        probability = response.capture_probability
+        probability.pokeball_type.extend(POKEBALLS[:3])
+        probability.capture_probability.extend([0.5, 0.7, 0.9])
+
+    def _disk_encounter(self, player, message, response, envelope, now_ms):
+        fort = self._forts.get(message.fort_id)
+        response.result = 2 if fort is None else 1
+        if fort is not None:
+            response.pokemon_data.pokemon_id = 1 + message.encounter_id % 151
+
+    def _catch_pokemon(self, player, message, response, envelope, now_ms):
+        pokemon = player.encounters.get(message.encounter_id)
+        if pokemon is None or player.get_item_count(message.pokeball) <= 0:
+            response.status = 0
+            return
+
+        player.set_item(message.pokeball, player.get_item_count(message.pokeball) - 1, now_ms)
+        if self._random.random() < 0.25:
+            response.status = 4
+            response.miss_percent = 1
+            return
+
+        del player.encounters[message.encounter_id]
+
+        data = InventoryItemData()
+        caught = data.pokemon_data
+        caught.id = self._random.getrandbits(63)
+        caught.pokemon_id = pokemon['pokemon_id']
+        caught.cp = 10 + pokemon['encounter_id'] % 500
+        caught.stamina = caught.stamina_max = 10 + pokemon['encounter_id'] % 90
+        caught.pokeball = message.pokeball
+        caught.creation_time_ms = now_ms
+        player.touch(caught.id, data, now_ms)
+        player.set_candy(caught.pokemon_id, player.get_candy(caught.pokemon_id) + 3, now_ms)
+        player.stardust += 100
+        player.add_experience(100, now_ms)
+
+        response.status = 1
+        response.captured_pokemon_id = caught.id
+        response.capture_award.activity_type.append(1)
+        response.capture_award.xp.append(100)
+        response.capture_award.candy.append(3)
+        response.capture_award.stardust.append(100)
+
+    def _release_pokemon(self, player, message, response, envelope, now_ms):
+        pokemon = player.get_pokemon(message.pokemon_id)
+        if pokemon is None:
+            response.result = 3
+            return
+
+        player.remove(message.pokemon_id, now_ms)
+        player.set_candy(pokemon.pokemon_id, player.get_candy(pokemon.pokemon_id) + 1, now_ms)
+        response.result = 1
+        response.candy_awarded = 1
+
+    def _evolve_pokemon(self, player, message, response, envelope, now_ms):
+        pokemon = player.get_pokemon(message.pokemon_id)
+        if pokemon is None:
+            response.result = 2
+            return
+        if player.get_candy(pokemon.pokemon_id) < EVOLVE_CANDY:
+            response.result = 3
+            return
+
+        data = InventoryItemData()
+        data.pokemon_data.CopyFrom(pokemon)
+        data.pokemon_data.pokemon_id = min(pokemon.pokemon_id + 1, 151)
+        data.pokemon_data.cp = int(pokemon.cp * 1.6)
+        player.set_candy(pokemon.pokemon_id, player.get_candy(pokemon.pokemon_id) - EVOLVE_CANDY, now_ms)
+        player.touch(message.pokemon_id, data, now_ms)
+        player.add_experience(500, now_ms)
+
+        response.result = 1
+        response.evolved_pokemon_data.CopyFrom(data.pokemon_data)
+        response.experience_awarded = 500
+        response.candy_awarded = 1
+
+    def _nickname_pokemon(self, player, message, response, envelope, now_ms):
+        pokemon = player.get_pokemon(message.pokemon_id)
+        if pokemon is None:
+            response.result = 3
+            return
+
+        data = InventoryItemData()
+        data.pokemon_data.CopyFrom(pokemon)
+        data.pokemon_data.nickname = message.nickname
+        player.touch(message.pokemon_id, data, now_ms)
+        response.result = 1
+
+    def _recycle_inventory_item(self, player, message, response, envelope, now_ms):
+        count = player.get_item_count(message.item_id)
+        if count < message.count:
+            response.result = 2
+            return
+
+        player.set_item(message.item_id, count - message.count, now_ms)
+        response.result = 1
+        response.new_count = count - message.count
+
+    def _use_item_capture(self, player, message, response, envelope, now_ms):
+        count = player.get_item_count(message.item_id)
+        response.success = count > 0 and message.encounter_id in player.encounters
+        if response.success:
+            player.set_item(message.item_id, count - 1, now_ms)
+            response.item_capture_mult = 1.5
+
+    def _use_item_xp_boost(self, player, message, response, envelope, now_ms):
+        count = player.get_item_count(message.item_id)
+        if count <= 0:
+            response.result = 4
+            return
+
+        player.set_item(message.item_id, count - 1, now_ms)
+        response.result = 1
+        response.applied_items.item.add(item_id=message.item_id, item_type=0, applied_ms=now_ms, expire_ms=now_ms + 30 * 60 * 1000)
+
+    def _use_item_egg_incubator(self, player, message, response, envelope, now_ms):
+        incubators = player.get_data('egg_incubators')
+        egg = player.get_pokemon(message.pokemon_id)
+        incubator = None
+        for candidate in incubators.egg_incubators.egg_incubator:
+            if candidate.id == message.item_id:
+                incubator = candidate
+
+        if incubator is None:
+            response.result = 2
+        elif egg is None or not egg.is_egg:
+            response.result = 3
+        elif incubator.pokemon_id:
+            response.result = 5
+        else:
+            data = InventoryItemData()
+            data.CopyFrom(incubators)
+            for candidate in data.egg_incubators.egg_incubator:
+                if candidate.id == message.item_id:
+                    candidate.pokemon_id = message.pokemon_id
+                    candidate.target_km_walked = egg.egg_km_walked_target
+                    response.egg_incubator.CopyFrom(candidate)
+            player.touch('egg_incubators', data, now_ms)
+            response.result = 1
+
+
+class InProcessTransport(Transport):
+
+    blocking = False
+
+    def __init__(self, server = None):
+        self.server = server or StandinServer()
+
+    def send(self, endpoint, data, timeout = None):
+        return self.server.handle(endpoint, data)
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status, content = self.server.standin.handle(self.path, data)
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/binary')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        log.debug(format, *args)
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class StandinHTTPServer:
+
+    """ Serves a StandinServer over plain HTTP on localhost, point PGoApi.set_api_endpoint() to get_api_entry() """
+
+    def __init__(self, server = None, host = '127.0.0.1', port = 0):
+        self.log = logging.getLogger(__name__)
+
+        self.standin = server or StandinServer()
+        self._httpd = _ThreadingHTTPServer((host, port), _RequestHandler)
+        self._httpd.standin = self.standin
+        self._thread = None
+
+        host, port = self._httpd.server_address[:2]
+        self.standin.set_api_url('{}:{}/custom'.format(host, port))
+        self._address = '{}:{}'.format(host, port)
+
+    def get_api_entry(self):
+        return 'http://{}/plfe/rpc'.format(self._address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='standin-http')
+        self._thread.daemon = True
+        self._thread.start()
+        self.log.info('Stand-in server listening on %s', self.get_api_entry())
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Pokemon Go RPC server')
+    parser.add_argument("--host", help="Address to bind", default='127.0.0.1')
+    parser.add_argument("-p", "--port", help="Port to listen on", type=int, default=8080)
+    parser.add_argument("-s", "--seed", help="Seed of the generated world", type=int, default=0)
+    parser.add_argument("-r", "--rate-limit", help="Max. requests per second and player (status code 52 above)", type=int, default=None)
+    config = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(module)10s] [%(levelname)5s] %(message)s')
+
+    httpd = StandinHTTPServer(StandinServer(seed=config.seed, rate_limit=config.rate_limit), config.host, config.port)
+    httpd.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        httpd.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from pgoapi.rate_limit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+
+class AimdThrottle:
+
+    """
+    Additive increase / multiplicative decrease of a request rate: every successful call raises
+    the rate by increase, every throttled one (status code 52) multiplies it by decrease.
+    """
+
+    def __init__(self, rate = 3.0, min_rate = 0.2, max_rate = 10.0, increase = 0.1, decrease = 0.5, burst = 1):
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._increase = increase
+        self._decrease = decrease
+
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._bucket = TokenBucket(rate, burst)
+
+        self.calls = 0
+        self.throttled = 0
+
+    def get_rate(self):
+        return self._rate
+
+    def reserve(self):
+        return self._bucket.reserve()
+
+    def release(self):
+        self._bucket.release()
+
+    def on_success(self):
+        with self._lock:
+            self.calls += 1
+            self._rate = min(self._max_rate, self._rate + self._increase)
+            self._bucket.set_rate(self._rate)
+
+    def on_throttle(self):
+        with self._lock:
+            self.calls += 1
+            self.throttled += 1
+            self._rate = max(self._min_rate, self._rate * self._decrease)
+            self._bucket.set_rate(self._rate)
+            return self._rate
+
+    def get_metrics(self):
+        return {'rate': self._rate, 'calls': self.calls, 'throttled': self.throttled}
+
+
+class ThrottleController:
+
+    """ One AimdThrottle per API endpoint, use one controller per account """
+
+    def __init__(self, **throttle_args):
+        self.log = logging.getLogger(__name__)
+
+        self._throttle_args = throttle_args
+        self._lock = threading.Lock()
+        self._throttles = {}
+
+    def get_throttle(self, endpoint):
+        throttle = self._throttles.get(endpoint)
+        if throttle is None:
+            with self._lock:
+                throttle = self._throttles.get(endpoint)
+                if throttle is None:
+                    throttle = self._throttles[endpoint] = AimdThrottle(**self._throttle_args)
+        return throttle
+
+    def get_rate(self, endpoint):
+        return self.get_throttle(endpoint).get_rate()
+
+    def reserve(self, endpoint):
+        return self.get_throttle(endpoint).reserve()
+
+    def release(self, endpoint):
+        self.get_throttle(endpoint).release()
+
+    def on_success(self, endpoint):
+        self.get_throttle(endpoint).on_success()
+
+    def on_throttle(self, endpoint):
+        rate = self.get_throttle(endpoint).on_throttle()
+        self.log.info('Throttled by server on %s - backing off to %.2f requests/s', endpoint, rate)
+
+    def get_metrics(self):
+        # endpoint -> {'rate': current requests/s, 'calls': ..., 'throttled': ...}
+        return dict((endpoint, throttle.get_metrics()) for endpoint, throttle in list(self._throttles.items()))
@@ -0,0 +1,232 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import os
+import json
+import base64
+import logging
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from pgoapi.utilities import get_time_ms
+
+# tokens without a known expiry are trusted for this long after they were saved
+UNKNOWN_TOKEN_LIFETIME_MS = 30 * 60 * 1000
+
+# per user, never relative to the current directory of the caller
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.pgoapi', 'tokens.json')
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class _FileLock:
+
+    """ Exclusive lock over a lock file next to the store, shared by all processes using it """
+
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self._path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *args):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+class TokenStore:
+
+    """
+    Auth tokens and tickets per provider and username in a JSON file. The file is read on first use
+    and again whenever another process changed it, writes merge into the current content under a file lock.
+    """
+
+    def __init__(self, path = DEFAULT_PATH, master_tokens = False):
+        self.log = logging.getLogger(__name__)
+
+        self._path = os.path.abspath(path)
+        # Google master tokens are as good as the password, they are only kept if asked for
+        self._master_tokens = master_tokens
+        self._lock = threading.Lock()
+        self._file_lock = None
+
+        self._entries = None
+        self._stat = None
+
+    def get_path(self):
+        return self._path
+
+    def _key(self, provider, username):
+        return '{}:{}'.format(provider, username.lower())
+
+    def _get_stat(self):
+        # every write replaces the file, inode, size and mtime (in ns where available) tell a changed file
+        try:
+            st = os.stat(self._path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime))
+
+    def _get_file_lock(self):
+        if self._file_lock is None:
+            directory = os.path.dirname(self._path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory, 0o700)
+            self._file_lock = _FileLock(self._path + '.lock')
+        return self._file_lock
+
+    def _read(self):
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except (IOError, OSError):
+            return {}
+        except ValueError as e:
+            self.log.warning('Ignoring unreadable token store %s: %s', self._path, str(e))
+            return {}
+
+    def _load(self):
+        stat = self._get_stat()
+        if self._entries is None or stat != self._stat:
+            self._entries = self._read()
+            self._stat = stat
+        return self._entries
+
+    def _write(self, entries):
+        directory = os.path.dirname(self._path)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tokens', dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        _replace(tmp_path, self._path)
+
+        self._entries = entries
+        self._stat = self._get_stat()
+
+    def _update(self, key, entry):
+        with self._lock:
+            with self._get_file_lock():
+                # re-read under the lock if other processes changed the file meanwhile
+                entries = self._load()
+                if entries.get(key) == entry or (entry is None and key not in entries):
+                    return
+                entries = dict(entries)
+                if entry is None:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = entry
+                self._write(entries)
+
+    def _is_unchanged(self, key, entry):
+        # logins and refreshes repeating what is stored already (e.g. many pooled accounts) skip the write
+        with self._lock:
+            current = self._load().get(key)
+        if current is None:
+            return False
+        names = (set(current) | set(entry)) - set(['saved'])
+        return all(current.get(name) == entry.get(name) for name in names)
+
+    def get(self, provider, username, min_valid = 60):
+        # dict with token, token_expire and ticket if the token is valid for min_valid more seconds, else None
+        with self._lock:
+            entry = self._load().get(self._key(provider, username))
+        if not entry or not entry.get('token'):
+            return None
+
+        now_ms = get_time_ms()
+        token_expire = entry.get('token_expire') or entry.get('saved', 0) + UNKNOWN_TOKEN_LIFETIME_MS
+        if token_expire - now_ms < min_valid * 1000:
+            return None
+
+        result = {'token': entry['token'], 'token_expire': entry.get('token_expire'), 'ticket': None}
+        ticket = entry.get('ticket')
+        if ticket and ticket[0] - now_ms > min_valid * 1000:
+            result['ticket'] = (ticket[0], base64.b64decode(ticket[1]), base64.b64decode(ticket[2]))
+        return result
+
+    def put(self, provider, username, token, token_expire = None, ticket = None):
+        entry = {'token': token, 'token_expire': token_expire, 'saved': get_time_ms()}
+        if ticket:
+            expire, start, end = ticket
+            entry['ticket'] = [expire, base64.b64encode(start).decode('ascii'), base64.b64encode(end).decode('ascii')]
+        key = self._key(provider, username)
+        if not self._is_unchanged(key, entry):
+            self._update(key, entry)
+
+    def remove(self, provider, username):
+        self._update(self._key(provider, username), None)
+
+    # long-lived Google master tokens, see AuthGoogle. Other stores just need these three methods
+
+    def get_master_token(self, username):
+        if not self._master_tokens:
+            return None
+        with self._lock:
+            entry = self._load().get(self._key('google-master', username))
+        return entry.get('token') if entry else None
+
+    def put_master_token(self, username, master_token):
+        if not self._master_tokens:
+            return
+        self._update(self._key('google-master', username), {'token': master_token, 'saved': get_time_ms()})
+
+    def remove_master_token(self, username):
+        if not self._master_tokens:
+            return
+        self._update(self._key('google-master', username), None)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_token_store():
+    # None unless enabled by set_default_token_store(), caching tokens on disk is opt-in
+    return _default_store
+
+
+def set_default_token_store(store):
+    global _default_store
+    with _default_store_lock:
+        _default_store = store
@@ -0,0 +1,145 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+import requests
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from pgoapi.exceptions import ServerBusyOrOfflineException
+
+
+class Transport:
+
+    # False for transports which answer without waiting on I/O (no need to run them in a thread)
+    blocking = True
+
+    # send one serialized RequestEnvelope, returns (http status code, response body),
+    # timeout: seconds left for the call, only passed if it has a deadline
+    def send(self, endpoint, data, timeout = None):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class HttpTransport(Transport):
+
+    USER_AGENT = 'Niantic App'
+
+    def __init__(self, pool_size = 10, pool_hosts = 4, pool_block = False, timeout = 30, connect_retries = 2):
+        self.log = logging.getLogger(__name__)
+
+        # pool_size: kept-alive connections per host, pool_hosts: number of hosts pooled.
+        # pool_size should be at least the number of threads sending to one host at the same time
+        # (e.g. the max_workers of an AccountPool): with pool_block=False more connections are opened
+        # on demand but closed after use, with pool_block=True threads wait for a free connection.
+        self._pool_size = pool_size
+        self._pool_hosts = pool_hosts
+        self._pool_block = pool_block
+        # seconds (or a (connect, read) tuple) until a hanging connection is given up
+        self._timeout = timeout
+        # a refused or dropped connection is replaced by a new one this often, the request was not sent yet
+        self._connect_retries = connect_retries
+
+        self._lock = threading.Lock()
+        self._session = None
+
+    def _create_session(self):
+        session = requests.session()
+        session.headers.update({'User-Agent': self.USER_AGENT})
+        session.verify = True
+
+        retries = Retry(total=self._connect_retries, connect=self._connect_retries, read=0, redirect=0, status=0)
+        adapter = HTTPAdapter(pool_connections=self._pool_hosts, pool_maxsize=self._pool_size, pool_block=self._pool_block,
+                              max_retries=retries)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        self.log.debug('Created HTTP session (pool size per host: %s, hosts: %s)', self._pool_size, self._pool_hosts)
+        return session
+
+    def get_session(self):
+        session = self._session
+        if session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+                session = self._session
+        return session
+
+    def send(self, endpoint, data, timeout = None):
+        session = self.get_session()
+        if timeout is None:
+            timeout = self._timeout
+        elif isinstance(self._timeout, tuple):
+            timeout = tuple(min(t, timeout) for t in self._timeout)
+        else:
+            timeout = min(self._timeout, timeout)
+        try:
+            response = session.post(endpoint, data=data, timeout=timeout)
+            return (response.status_code, response.content)
+        except requests.exceptions.Timeout as e:
+            self.log.debug('Timeout on %s (%s)', endpoint, str(e))
+            raise ServerBusyOrOfflineException
+        except requests.exceptions.ConnectionError as e:
+            # urllib3 already discarded the failed connection, the pools of other calls stay untouched
+            self.log.debug('Connection error on %s (%s)', endpoint, str(e))
+            raise ServerBusyOrOfflineException
+
+    def reset(self, session = None):
+        with self._lock:
+            if session is not None and session is not self._session:
+                return
+            old_session, self._session = self._session, None
+
+        if old_session is not None:
+            old_session.close()
+
+    def close(self):
+        self.reset()
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport():
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = HttpTransport()
+    return _default_transport
+
+
+def set_default_transport(transport):
+    global _default_transport
+    with _default_transport_lock:
+        _default_transport = transport
@@ -24,6 +24,7 @@ Author: tjado <https://github.com/tejado>
 """
 
 import re
+import math
 import time
 import struct
 import logging
@@ -34,6 +35,8 @@ from json import JSONEncoder
 from geopy.geocoders import GoogleV3
 from s2sphere import Cell, CellId, LatLng
 
+from pgoapi import cell_cover
+
 log = logging.getLogger(__name__)
 
 
@@ -73,20 +76,16 @@ def get_pos_by_name(location_name):
 
 
 def get_cell_ids(lat, long, radius = 10):
-    origin = CellId.from_lat_lng(LatLng.from_degrees(lat, long)).parent(15)
-    walk = [origin.id()]
-    right = origin.next()
-    left = origin.prev()
-
-    # Search around provided radius
-    for i in range(radius):
-        walk.append(right.id())
-        walk.append(left.id())
-        right = right.next()
-        left = left.prev()
-
-    # Return everything
-    return sorted(walk)
+    """Return the ids of about 2 * radius + 1 level 15 cells around the position, as before.
+
+    radius counts cells, not metres: it is converted to the metre radius pgoapi.cell_cover
+    takes by sizing a circle whose covering (every cell the circle touches, which also counts
+    the partly covered cells on its rim) averages 2 * radius + 1 cells of the local size.
+    """
+    cell = Cell(CellId.from_lat_lng(LatLng.from_degrees(lat, long)).parent(cell_cover.DEFAULT_LEVEL))
+    side = math.sqrt(cell.exact_area()) * cell_cover.EARTH_RADIUS_M
+    # cells touching a circle of radius r cover about pi * r^2 + 4 * r * side + side^2, solved for r
+    return cell_cover.get_cell_ids(lat, long, side * (math.sqrt(4 + math.pi * 2 * radius) - 2) / math.pi)
 
 def get_time_ms():
     return int(round(time.time() * 1000))
@@ -0,0 +1,162 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import sys
+import struct
+import logging
+import argparse
+import threading
+import subprocess
+
+from pgoapi.utilities import get_time_ms
+from pgoapi.registry import REQUEST_CLASSES, RESPONSE_CLASSES
+
+from . import protos
+from POGOProtos.Networking.Envelopes_pb2 import RequestEnvelope
+from POGOProtos.Networking.Envelopes_pb2 import ResponseEnvelope
+from POGOProtos.Networking.Requests_pb2 import RequestType
+
+# record layout: direction, capture time in ms, length of the raw envelope
+RECORD_HEADER = struct.Struct('<BQI')
+
+DIRECTION_REQUEST = 1
+DIRECTION_RESPONSE = 2
+
+
+class WireCapture:
+
+    def __init__(self, path):
+        self.log = logging.getLogger(__name__)
+
+        self._path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+
+        self.log.info('Capturing raw RPC envelopes to %s', path)
+
+    def get_path(self):
+        return self._path
+
+    def _write(self, direction, raw):
+        record = RECORD_HEADER.pack(direction, get_time_ms(), len(raw)) + raw
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+
+    def write_request(self, raw):
+        self._write(DIRECTION_REQUEST, raw)
+
+    def write_response(self, raw):
+        self._write(DIRECTION_RESPONSE, raw or b'')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_capture(path):
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            direction, timestamp_ms, length = RECORD_HEADER.unpack(header)
+            raw = f.read(length)
+            if len(raw) < length:
+                return
+            yield (direction, timestamp_ms, raw)
+
+
+def decode_raw(raw):
+    output = error = None
+    try:
+        process = subprocess.Popen(['protoc', '--decode_raw'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, error = process.communicate(raw)
+        output = output.decode('utf-8')
+    except:
+        output = "Couldn't find protoc in your environment OR other issue..."
+
+    return output
+
+
+def _format_message(request_type, raw, classes):
+    name = RequestType.Name(request_type) if request_type in RequestType.values() else str(request_type)
+    cls = classes.get(request_type)
+    if cls is None:
+        return '{}: no protobuf definition ({} bytes)\n'.format(name, len(raw))
+
+    proto = cls()
+    try:
+        proto.ParseFromString(raw)
+    except Exception as e:
+        return '{}: protobuf definition seems not to match ({})\n'.format(name, str(e))
+
+    return '{} ({}):\n{}'.format(name, cls.__name__, proto)
+
+
+def decode_capture(path, out=sys.stdout, raw=False):
+    # request types of sent envelopes by request id, used to decode the matching responses
+    request_types = {}
+
+    for direction, timestamp_ms, data in read_capture(path):
+        if direction == DIRECTION_REQUEST:
+            envelope = RequestEnvelope()
+            envelope.ParseFromString(data)
+            request_types[envelope.request_id] = [r.request_type for r in envelope.requests]
+
+            out.write('===== {} REQUEST {} ({} bytes)\n{}'.format(timestamp_ms, envelope.request_id, len(data), envelope))
+            for subrequest in envelope.requests:
+                if subrequest.request_message:
+                    out.write(_format_message(subrequest.request_type, subrequest.request_message, REQUEST_CLASSES))
+        else:
+            envelope = ResponseEnvelope()
+            try:
+                envelope.ParseFromString(data)
+            except Exception as e:
+                out.write('===== {} RESPONSE - could not parse ({} bytes): {}\n'.format(timestamp_ms, len(data), str(e)))
+                continue
+
+            out.write('===== {} RESPONSE {} ({} bytes)\n{}'.format(timestamp_ms, envelope.request_id, len(data), envelope))
+            types = request_types.pop(envelope.request_id, [])
+            for request_type, subresponse in zip(types, envelope.returns):
+                out.write(_format_message(request_type, subresponse, RESPONSE_CLASSES))
+
+        if raw:
+            out.write('Decode raw over protoc (protoc has to be in your PATH):\n{}'.format(decode_raw(data)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode a pgoapi wire capture file')
+    parser.add_argument("capture", help="Capture file written by PGoApi.set_wire_capture()")
+    parser.add_argument("-r", "--raw", help="Additionally decode every envelope with protoc --decode_raw", action='store_true')
+    config = parser.parse_args()
+
+    decode_capture(config.capture, raw=config.raw)
+
+
+if __name__ == '__main__':
+    main()
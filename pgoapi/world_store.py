@@ -0,0 +1,248 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import json
+import math
+import base64
+import logging
+import sqlite3
+import threading
+
+from pgoapi.utilities import get_time_ms
+from pgoapi.spatial_index import distance_m, METERS_PER_DEGREE
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cells (
+    cell_id INTEGER PRIMARY KEY,
+    current_timestamp_ms INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS forts (
+    id TEXT PRIMARY KEY,
+    cell_id INTEGER NOT NULL,
+    type INTEGER NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    last_modified_ms INTEGER,
+    updated_ms INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS forts_position ON forts (latitude, longitude);
+CREATE INDEX IF NOT EXISTS forts_cell ON forts (cell_id);
+CREATE TABLE IF NOT EXISTS spawn_points (
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    cell_id INTEGER NOT NULL,
+    last_seen_ms INTEGER NOT NULL,
+    PRIMARY KEY (latitude, longitude)
+);
+CREATE INDEX IF NOT EXISTS spawn_points_cell ON spawn_points (cell_id);
+CREATE TABLE IF NOT EXISTS encounters (
+    encounter_id INTEGER PRIMARY KEY,
+    spawn_point_id TEXT,
+    cell_id INTEGER NOT NULL,
+    pokemon_id INTEGER,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    first_seen_ms INTEGER NOT NULL,
+    last_seen_ms INTEGER NOT NULL,
+    hides_at_ms INTEGER,
+    data TEXT NOT NULL,
+    pokemon_data TEXT
+);
+CREATE INDEX IF NOT EXISTS encounters_position ON encounters (latitude, longitude);
+CREATE INDEX IF NOT EXISTS encounters_hides_at ON encounters (hides_at_ms);
+CREATE INDEX IF NOT EXISTS encounters_seen ON encounters (last_seen_ms);
+CREATE INDEX IF NOT EXISTS encounters_cell ON encounters (cell_id);
+CREATE INDEX IF NOT EXISTS encounters_spawn_point ON encounters (spawn_point_id);
+'''
+
+
+def _to_db_id(value):
+    # S2 cell and encounter ids are unsigned 64 bit, SQLite integers are signed
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _from_db_id(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+# bytes fields (e.g. active_fort_modifier) are stored as {BYTES_KEY: base64}, so they load as bytes again
+BYTES_KEY = '__bytes__'
+
+
+class _BytesEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, bytes):
+            return {BYTES_KEY: base64.b64encode(o).decode('ascii')}
+        return json.JSONEncoder.default(self, o)
+
+
+def _decode_bytes(obj):
+    if len(obj) == 1 and BYTES_KEY in obj:
+        return base64.b64decode(obj[BYTES_KEY])
+    return obj
+
+
+def _dumps(obj):
+    return json.dumps(obj, cls = _BytesEncoder)
+
+
+def _loads(data):
+    return json.loads(data, object_hook = _decode_bytes)
+
+
+class WorldStore:
+
+    """
+    Persists what the scans learned (map cells, forts, spawn points and wild pokemon encounters) in SQLite.
+    Every scan is written in one transaction, rows are upserted by fort id and encounter id.
+    load() warm starts a pgoapi.map_cache.MapCellCache, so a restarted client only downloads changes.
+    """
+
+    def __init__(self, path = 'world.db'):
+        self.log = logging.getLogger(__name__)
+
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread = False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def get_path(self):
+        return self._path
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def save_map_cells(self, map_cells, now_ms = None):
+        # map cells of a GET_MAP_OBJECTS response, wild pokemon need hides_at_ms (see MapCellCache.apply)
+        now_ms = now_ms or get_time_ms()
+        cells, forts, deleted, spawn_points, encounters = [], [], [], [], []
+
+        for map_cell in map_cells:
+            cell_id = _to_db_id(map_cell['s2_cell_id'])
+            if not map_cell.get('is_truncated_list'):
+                cells.append((cell_id, map_cell.get('current_timestamp_ms', 0)))
+
+            deleted.extend((fort_id, ) for fort_id in map_cell.get('deleted_objects', []))
+            for fort in map_cell.get('forts', []):
+                forts.append((fort['id'], cell_id, fort.get('type', 0), fort.get('latitude', 0.0), fort.get('longitude', 0.0),
+                              fort.get('last_modified_timestamp_ms'), now_ms, _dumps(fort)))
+
+            for spawn_point in map_cell.get('spawn_points', []):
+                spawn_points.append((spawn_point.get('latitude', 0.0), spawn_point.get('longitude', 0.0), cell_id, now_ms))
+
+            for wild_pokemon in map_cell.get('wild_pokemons', []):
+                encounter_id = _to_db_id(wild_pokemon['encounter_id'])
+                hides_at_ms = wild_pokemon.get('hides_at_ms') or now_ms + wild_pokemon.get('time_till_hidden_ms', 0)
+                encounters.append((encounter_id, wild_pokemon.get('spawn_point_id'), cell_id,
+                                   wild_pokemon.get('pokemon_data', {}).get('pokemon_id'),
+                                   wild_pokemon.get('latitude', 0.0), wild_pokemon.get('longitude', 0.0),
+                                   encounter_id, now_ms, now_ms, hides_at_ms, _dumps(wild_pokemon), encounter_id))
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany('INSERT OR REPLACE INTO cells VALUES (?, ?)', cells)
+                self._conn.executemany('DELETE FROM forts WHERE id = ?', deleted)
+                self._conn.executemany('INSERT OR REPLACE INTO forts VALUES (?, ?, ?, ?, ?, ?, ?, ?)', forts)
+                self._conn.executemany('INSERT OR REPLACE INTO spawn_points VALUES (?, ?, ?, ?)', spawn_points)
+                # keeps first_seen_ms and the details of earlier encounter calls
+                self._conn.executemany('INSERT OR REPLACE INTO encounters VALUES (?, ?, ?, ?, ?, ?, '
+                                       'COALESCE((SELECT first_seen_ms FROM encounters WHERE encounter_id = ?), ?), ?, ?, ?, '
+                                       '(SELECT pokemon_data FROM encounters WHERE encounter_id = ?))', encounters)
+
+        self.log.debug('Saved %s cells, %s forts, %s spawn points, %s encounters', len(cells), len(forts), len(spawn_points), len(encounters))
+
+    def save_encounter(self, encounter_id, pokemon_data):
+        # details of an ENCOUNTER response (IVs, moves, cp) for a wild pokemon saved before
+        with self._lock:
+            with self._conn:
+                self._conn.execute('UPDATE encounters SET pokemon_data = ? WHERE encounter_id = ?',
+                                   (_dumps(pokemon_data), _to_db_id(encounter_id)))
+
+    def load(self, map_cache, now_ms = None):
+        # warm starts map_cache with all saved cells, their forts, spawn points and visible pokemon
+        now_ms = now_ms or get_time_ms()
+        with self._lock:
+            cells = dict((cell_id, {'timestamp': timestamp, 'forts': [], 'spawn_points': [], 'wild_pokemons': []})
+                         for cell_id, timestamp in self._conn.execute('SELECT cell_id, current_timestamp_ms FROM cells'))
+            for cell_id, data in self._conn.execute('SELECT cell_id, data FROM forts'):
+                if cell_id in cells:
+                    cells[cell_id]['forts'].append(_loads(data))
+            for cell_id, latitude, longitude in self._conn.execute('SELECT cell_id, latitude, longitude FROM spawn_points'):
+                if cell_id in cells:
+                    cells[cell_id]['spawn_points'].append({'latitude': latitude, 'longitude': longitude})
+            for cell_id, data in self._conn.execute('SELECT cell_id, data FROM encounters WHERE hides_at_ms > ?', (now_ms, )):
+                if cell_id in cells:
+                    cells[cell_id]['wild_pokemons'].append(_loads(data))
+
+        for cell_id, cell in cells.items():
+            map_cache.restore(_from_db_id(cell_id), cell['timestamp'], cell['forts'], cell['spawn_points'], cell['wild_pokemons'])
+
+        self.log.info('Loaded %s map cells from %s', len(cells), self._path)
+        return len(cells)
+
+    def _query_near(self, query, lat, lng, radius, params = ()):
+        # bounding box on the position index, then the exact distance
+        lat_span = float(radius) / METERS_PER_DEGREE
+        lng_span = lat_span / max(math.cos(math.radians(min(abs(lat) + lat_span, 90.0))), 1e-6)
+        with self._lock:
+            rows = self._conn.execute(query, (lat - lat_span, lat + lat_span, lng - lng_span, lng + lng_span) + tuple(params)).fetchall()
+
+        result = [(distance_m(lat, lng, row[0], row[1]), _loads(row[2])) for row in rows]
+        result = [entry for entry in result if entry[0] <= radius]
+        result.sort(key = lambda entry: entry[0])
+        return [obj for _, obj in result]
+
+    def get_forts_near(self, lat, lng, radius):
+        return self._query_near('SELECT latitude, longitude, data FROM forts '
+                                'WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?', lat, lng, radius)
+
+    def get_encounters_near(self, lat, lng, radius, now_ms = None):
+        # wild pokemon around a position which are still visible
+        return self._query_near('SELECT latitude, longitude, data FROM encounters '
+                                'WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ? AND hides_at_ms > ?',
+                                lat, lng, radius, (now_ms or get_time_ms(), ))
+
+    def get_encounters(self, since_ms = 0, until_ms = None, pokemon_id = None):
+        # encounters last seen within [since_ms, until_ms], as (wild pokemon, pokemon data of an encounter call or None)
+        query = 'SELECT data, pokemon_data FROM encounters WHERE last_seen_ms >= ? AND last_seen_ms <= ?'
+        params = [since_ms, until_ms or get_time_ms()]
+        if pokemon_id is not None:
+            query += ' AND pokemon_id = ?'
+            params.append(pokemon_id)
+
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY last_seen_ms', params).fetchall()
+        return [(_loads(data), _loads(pokemon_data) if pokemon_data else None) for data, pokemon_data in rows]
+
+    def prune(self, before_ms):
+        # drops encounters hidden before before_ms
+        with self._lock:
+            with self._conn:
+                return self._conn.execute('DELETE FROM encounters WHERE hides_at_ms < ?', (before_ms, )).rowcount
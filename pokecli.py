@@ -27,7 +27,6 @@ Author: tjado <https://github.com/tejado>
 import os
 import sys
 import json
-import time
 import pprint
 import logging
 import getpass
@@ -39,6 +38,7 @@ sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 # import Pokemon Go API lib
 from pgoapi import pgoapi
 from pgoapi import utilities as util
+from pgoapi.rate_limit import RateLimiter
 
 
 log = logging.getLogger(__name__)
@@ -62,6 +62,7 @@ def init_config():
     parser.add_argument("-l", "--location", help="Location", required=required("location"))
     parser.add_argument("-d", "--debug", help="Debug Mode", action='store_true')
     parser.add_argument("-t", "--test", help="Only parse the specified location", action='store_true')
+    parser.add_argument("-c", "--capture", help="Write raw RPC envelopes to this file (decode with: python -m pgoapi.wire_capture <file>)")
     parser.set_defaults(DEBUG=False, TEST=False)
     config = parser.parse_args()
 
@@ -103,7 +104,10 @@ def main():
 
 
     # instantiate pgoapi
-    api = pgoapi.PGoApi()
+    # space the calls due to server-side throttling
+    api = pgoapi.PGoApi(rate_limiter = RateLimiter(rate = 5, burst = 1))
+    if config.capture:
+        api.set_wire_capture(config.capture)
 
     # parse position
     position = util.get_pos_by_name(config.location)
@@ -123,9 +127,7 @@ def main():
     # ----------------------
     response_dict = api.get_player()
     print('Response dictionary (get_player): \n\r{}'.format(pprint.PrettyPrinter(indent=4).pformat(response_dict)))
-    
-    # sleep 200ms due to server-side throttling
-    time.sleep(0.2)
+
 
     # get player profile + inventory call (thread-safe/chaining example)
     # ----------------------